@@ -28,6 +28,9 @@ PORT_PATH = _root / "portfolio"
 # Путь к директории с логами
 LOG_PATH = _root / "logs"
 
+# Путь к директории с контрольными точками обучения моделей
+CHECKPOINTS_PATH = _root / "checkpoints"
+
 # Конфигурация логгера
 logging.basicConfig(level=logging.INFO, handlers=get_handlers(LOG_PATH))
 
@@ -63,5 +66,13 @@ OPTIMIZER = cast(str, _cfg.get("OPTIMIZER", "resample"))
 MIN_TEST_DAYS = cast(int, _cfg.get("MIN_TEST_DAYS", 27)) * MONTH_IN_TRADING_DAYS
 TARGET_POPULATION = cast(int, _cfg.get("TARGET_POPULATION", 100))
 DEVICE = cast(str, _cfg.get("DEVICE", "cpu"))
+COMPILE_INFERENCE = cast(bool, _cfg.get("COMPILE_INFERENCE", False))
+PRECISION = cast(str, _cfg.get("PRECISION", "float32"))
+WARM_START_EPOCHS = cast(float, _cfg.get("WARM_START_EPOCHS", 0.25))
+WARM_START_MAX = cast(int, _cfg.get("WARM_START_MAX", 4))
+WEIGHTS_FLOAT16 = cast(bool, _cfg.get("WEIGHTS_FLOAT16", False))
+SURROGATE_CANDIDATES = cast(int, _cfg.get("SURROGATE_CANDIDATES", 16))
+CHECKPOINT_MINUTES = cast(float, _cfg.get("CHECKPOINT_MINUTES", 10))
+DATA_WORKERS = cast(int, _cfg.get("DATA_WORKERS", 0))
 
 torch.device(DEVICE)
@@ -1,5 +1,5 @@
 """Прогнозирование доходности  с помощью нейронных сетей."""
 from poptimizer.dl.data_loader import PhenotypeData
 from poptimizer.dl.forecast import Forecast
-from poptimizer.dl.model import Model
+from poptimizer.dl.model import DeadlineError, Model
 from poptimizer.dl.models.wave_net import ModelError
@@ -1,47 +1,235 @@
 """Формирование примеров для обучения в формате PyTorch."""
-from typing import Any, Dict, List, Tuple, Type, Union
+from typing import Any, Dict, Final, Iterator, List, Optional, Tuple, Type, Union
 
+import numpy as np
 import pandas as pd
+import torch
 from torch import Tensor
 from torch.utils import data
 
+from poptimizer.config import DEVICE
 from poptimizer.dl import features
 
 # Описание фенотипа и его подразделов
 PhenotypeData = Dict[str, Union[Any, "PhenotypeData"]]
+# Ключ объединенных численных последовательностей в примере
+SEQUENCE: Final = "Sequence"
 
 
 class OneTickerDataset(data.Dataset):
-    """Готовит обучающие примеры для одного тикера на основе параметров модели."""
+    """Готовит обучающие примеры для одного тикера на основе параметров модели.
+
+    Исходные ряды всех численных последовательностей объединяются в одну матрицу (каналы, время), из которой окно
+    каждого примера нарезается одним срезом и нормируется одной векторной операцией с помощью заранее рассчитанных
+    сдвигов и масштабов. Последовательности передаются в сеть по ключу SEQUENCE в виде тензора (каналы, время), а после
+    объединения в батч — (батч, каналы, время).
+    """
 
     def __init__(self, ticker: str, params: features.DataParams):
         self.len = params.len(ticker)
-        self.features = [
-            getattr(features, feat_name)(ticker, params) for feat_name in params.get_all_feat()
-        ]
+        self.base_len = len(params.price(ticker))
+        self.history_days = params.history_days
+        all_features = [getattr(features, feat_name)(ticker, params) for feat_name in params.get_all_feat()]
+        self.features = [feat for feat in all_features if not isinstance(feat, features.SequenceFeature)]
+        self.sequences = [feat for feat in all_features if isinstance(feat, features.SequenceFeature)]
+        self.series = None
+        self.shift = None
+        self.scale = None
+        if self.sequences:
+            self.series = torch.stack([feature.series for feature in self.sequences])
+            self.shift = torch.stack([feature.shift for feature in self.sequences])
+            self.scale = torch.stack([feature.scale for feature in self.sequences])
 
     def __getitem__(self, item) -> Dict[str, Union[Tensor, List[Tensor]]]:
         example = {}
         for feature in self.features:
             key = feature.__class__.__name__
             example[key] = feature[item]
+
+        if self.sequences:
+            window = self.series[:, item : item + self.history_days].float()
+            example[SEQUENCE] = (window - self.shift[:, item : item + 1]) / self.scale[:, item : item + 1]
+
         return example
 
     def __len__(self) -> int:
         return self.len
 
+    @property
+    def labels(self) -> Optional[Tensor]:
+        """Метки всех примеров тикера или None, если метки не формируются."""
+        for feature in self.features:
+            if isinstance(feature, features.Label):
+                return feature.labels
+
+        return None
+
     @property
     def features_description(self) -> Dict[str, Tuple[features.FeatureType, int]]:
-        """Словарь с описанием всех признаков."""
+        """Словарь с описанием всех признаков.
+
+        Для объединенных численных последовательностей указывается количество каналов.
+        """
         features_description = {}
         for feature in self.features:
             key = feature.__class__.__name__
             features_description[key] = feature.type_and_size
+        if self.sequences:
+            features_description[SEQUENCE] = (features.FeatureType.SEQUENCE, len(self.sequences))
         return features_description
 
 
+class TickersDataset(data.Dataset):
+    """Примеры для всех тикеров в виде единых массивов.
+
+    Исходные ряды признаков всех тикеров объединяются последовательно, а таблица смещений хранит для каждого примера
+    позицию начала окна в объединенных рядах и номер тикера. Пример или батч формируется по номеру или тензору номеров
+    примеров несколькими выборками из объединенных массивов на том же устройстве, где хранятся данные:
+
+    - окна численных последовательностей и других признаков-окон выбираются по позиции начала окна из представления
+      рядов в виде окон (unfold), не требующего копирования;
+    - метки рассчитаны заранее и выбираются по номеру примера;
+    - остальные признаки не зависят от номера примера и выбираются по номеру тикера.
+    """
+
+    def __init__(self, data_sets: List[OneTickerDataset]):
+        first = data_sets[0]
+        self._description = first.features_description
+        self._history_days = first.history_days
+
+        base_starts = np.cumsum([0] + [data_set.base_len for data_set in data_sets[:-1]])
+        self._positions = torch.cat(
+            [torch.arange(len(data_set), device=DEVICE) + start for data_set, start in zip(data_sets, base_starts)],
+        )
+        self._rows = torch.cat(
+            [torch.full((len(data_set),), row, device=DEVICE) for row, data_set in enumerate(data_sets)],
+        )
+
+        self._windows = {}
+        self._constants = {}
+        self._labels = {}
+        for n_feature, feature in enumerate(first.features):
+            key = feature.__class__.__name__
+            ticker_features = [data_set.features[n_feature] for data_set in data_sets]
+            if isinstance(feature, features.WindowFeature):
+                self._windows[key] = torch.cat([ticker_feature.series for ticker_feature in ticker_features])
+            elif isinstance(feature, features.Label):
+                self._labels[key] = torch.cat([ticker_feature.labels for ticker_feature in ticker_features])
+            else:
+                self._constants[key] = torch.stack([ticker_feature[0] for ticker_feature in ticker_features])
+
+        self._series = None
+        if first.sequences:
+            self._series = torch.cat([data_set.series for data_set in data_sets], dim=1)
+            self._shift = torch.cat([data_set.shift for data_set in data_sets], dim=1)
+            self._scale = torch.cat([data_set.scale for data_set in data_sets], dim=1)
+
+    def __getitem__(self, item: Union[int, List[int], Tensor]) -> Dict[str, Tensor]:
+        """Пример по номеру или батч по перечню номеров примеров."""
+        item = torch.as_tensor(item, dtype=torch.long, device=DEVICE)
+        positions = self._positions[item]
+        history_days = self._history_days
+
+        example = {}
+        for key in self._description:
+            if key in self._windows:
+                example[key] = self._windows[key].unfold(0, history_days, 1)[positions]
+            elif key in self._labels:
+                example[key] = self._labels[key][item]
+            elif key in self._constants:
+                example[key] = self._constants[key][self._rows[item]]
+
+        if self._series is not None:
+            window = self._series.unfold(1, history_days, 1)[:, positions].float()
+            shift = self._shift[:, positions].unsqueeze(-1)
+            scale = self._scale[:, positions].unsqueeze(-1)
+            example[SEQUENCE] = ((window - shift) / scale).movedim(0, -2)
+
+        return example
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def share_memory(self) -> "TickersDataset":
+        """Переносит массивы в разделяемую память.
+
+        Процессы загрузки данных получают доступ к массивам без их копирования, в том числе при создании процессов
+        методом spawn, когда набор данных передается процессам в сериализованном виде.
+        """
+        tensors = [self._positions, self._rows]
+        tensors.extend(self._windows.values())
+        tensors.extend(self._constants.values())
+        tensors.extend(self._labels.values())
+        if self._series is not None:
+            tensors.extend([self._series, self._shift, self._scale])
+
+        for tensor in tensors:
+            tensor.share_memory_()
+
+        return self
+
+    @property
+    def features_description(self) -> Dict[str, Tuple[features.FeatureType, int]]:
+        """Словарь с описанием всех признаков."""
+        return self._description
+
+    @property
+    def labels(self) -> Optional[Tensor]:
+        """Метки всех примеров или None, если метки не формируются."""
+        return next(iter(self._labels.values()), None)
+
+
+class IndexBatchSampler(data.Sampler):
+    """Сэмплер, выдающий батчи номеров примеров в виде тензоров на устройстве хранения данных.
+
+    Перестановка номеров формируется одной операцией на устройстве, а батчи являются ее срезами, поэтому номера
+    примеров не преобразуются в объекты Python.
+    """
+
+    def __init__(self, size: int, batch_size: int, shuffle: bool) -> None:
+        """
+        :param size:
+            Количество примеров.
+        :param batch_size:
+            Размер батча — последний батч может быть меньше.
+        :param shuffle:
+            Нужно ли перемешивать примеры в каждой эпохе.
+        """
+        super().__init__()
+        self._size = size
+        self._batch_size = batch_size
+        self._shuffle = shuffle
+        self._skip = 0
+
+    def __iter__(self) -> Iterator[Tensor]:
+        """Батчи номеров примеров для одной эпохи."""
+        if self._shuffle:
+            indexes = torch.randperm(self._size, device=DEVICE)
+        else:
+            indexes = torch.arange(self._size, device=DEVICE)
+
+        skip, self._skip = self._skip, 0
+
+        yield from indexes.split(self._batch_size)[skip:]
+
+    def skip(self, batches: int) -> None:
+        """Пропускает заданное количество первых батчей следующей эпохи без формирования примеров.
+
+        Используется для продолжения обучения с середины эпохи.
+        """
+        self._skip = batches
+
+    def __len__(self) -> int:
+        """Количество батчей в эпохе."""
+        return -(-self._size // self._batch_size)
+
+
 class DescribedDataLoader(data.DataLoader):
-    """Загрузчик данных, который дополнительно хранит описание параметров данных."""
+    """Загрузчик данных, который дополнительно хранит описание параметров данных.
+
+    Сэмплер выдает тензоры номеров примеров, по которым набор данных сразу формирует батч, поэтому отдельное
+    объединение примеров в батч не требуется.
+    """
 
     def __init__(
         self,
@@ -49,7 +237,7 @@ class DescribedDataLoader(data.DataLoader):
         end: pd.Timestamp,
         params: PhenotypeData,
         params_type: Type[features.DataParams],
-        num_workers: int = 0
+        num_workers: int = 0,
     ):
         """Формирует загрузчики данных для обучения, валидации, тестирования и прогнозирования для
         заданных тикеров и конечной даты на основе словаря с параметрами.
@@ -63,18 +251,30 @@ class DescribedDataLoader(data.DataLoader):
             Словарь с параметрами для построения признаков и других элементов модели.
         :param params_type:
             Тип формируемых признаков.
+        :param num_workers:
+            Количество процессов для формирования батчей. Процессы используются только при хранении данных в
+            оперативной памяти — массивы переносятся в разделяемую память, а батчи готовятся заранее параллельно с
+            обучением. Процессы сохраняются между эпохами.
         """
         params = params_type(tickers, end, params)
-        data_sets = [OneTickerDataset(ticker, params) for ticker in tickers]
+        dataset = TickersDataset([OneTickerDataset(ticker, params) for ticker in tickers])
+        if DEVICE != "cpu":
+            num_workers = 0
+        workers_params = {}
+        if num_workers:
+            dataset.share_memory()
+            workers_params = {"persistent_workers": True, "worker_init_fn": _init_worker}
+
         super().__init__(
-            dataset=data.ConcatDataset(data_sets),
-            batch_size=params.batch_size,
-            shuffle=params.shuffle,
-            drop_last=False,
-            num_workers=num_workers,  # Загрузка в отдельном потоке - увеличение потоков не докидывает
+            dataset=dataset,
+            batch_size=None,
+            sampler=IndexBatchSampler(len(dataset), params.batch_size, params.shuffle),
+            num_workers=num_workers,
+            **workers_params,
         )
-        self._features_description = data_sets[0].features_description
+        self._features_description = dataset.features_description
         self._history_days = params.history_days
+        self._dates = params.dates
 
     @property
     def features_description(self) -> Dict[str, Tuple[features.FeatureType, int]]:
@@ -85,3 +285,18 @@ class DescribedDataLoader(data.DataLoader):
     def history_days(self) -> int:
         """Количество дней в истории."""
         return self._history_days
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        """Даты, используемые для построения признаков."""
+        return self._dates
+
+    @property
+    def labels(self) -> Optional[Tensor]:
+        """Метки всех примеров в порядке следования без перемешивания или None, если метки не формируются."""
+        return self.dataset.labels
+
+
+def _init_worker(worker_id: int) -> None:
+    """Процесс загрузки данных использует один поток, чтобы не конкурировать с обучением за ядра процессора."""
+    torch.set_num_threads(1)
@@ -1,15 +1,25 @@
 """Описание модели и данных."""
 import abc
 import copy
-from typing import Generator, Tuple
+import types
+from typing import Callable, Generator, Tuple
 
 import pandas as pd
+import torch
 
 from poptimizer import config
 from poptimizer.data.views import quotes
 
 FORECAST_DAYS = config.FORECAST_DAYS
 
+# Тип хранения численных последовательностей с ограниченным диапазоном значений в зависимости от точности вычислений
+FEATURE_DTYPES = types.MappingProxyType(
+    {
+        "float32": torch.float,
+        "bfloat16": torch.float16,
+    },
+)
+
 
 def div_price_train_size(
     tickers: Tuple[str, ...],
@@ -47,6 +57,7 @@ class DataParams(abc.ABC):
         self._end = end
         self._params = copy.deepcopy(params)
         div, price = self._div_price(tickers, end)
+        self._dates = price.index
         self._div = {}
         self._price = {}
         for ticker in tickers:
@@ -88,6 +99,26 @@ class DataParams(abc.ABC):
         """Размер батча."""
         return self._params["batch_size"]
 
+    @property
+    def test_days(self) -> int:
+        """Количество последних дат, для которых формируются тестовые примеры."""
+        return self._params.get("test_days", 1)
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        """Даты, используемые для построения признаков всех тикеров."""
+        return self._dates
+
+    @property
+    def feature_dtype(self) -> torch.dtype:
+        """Тип для хранения численных последовательностей признаков с ограниченным диапазоном значений.
+
+        При вычислениях в bfloat16 такие последовательности, например логарифмы оборота, хранятся в float16, что вдвое
+        сокращает потребление памяти. Уровни цен и индексов всегда хранятся в float32 — они могут превышать
+        максимальное значение float16, а точности float16 недостаточно для расчета доходностей внутри окна.
+        """
+        return FEATURE_DTYPES[self._params.get("precision", config.PRECISION)]
+
     def price(self, ticker: str) -> pd.Series:
         """Цены для тикера.
 
@@ -104,6 +135,19 @@ class DataParams(abc.ABC):
         """
         return self._div[ticker]
 
+    def shared_series(self, ticker: str, key: str, load: Callable[[], pd.Series]) -> torch.Tensor:
+        """Общий для всех тикеров ряд, выровненный по датам тикера.
+
+        Ряд загружается и выравнивается по датам всех тикеров один раз, сохраняется в кеше под заданным ключом, а для
+        тикера возвращается представление, начинающееся с его первой даты.
+        """
+        if (series := self._cache.get(key)) is None:
+            series = load().reindex(self._dates, method="ffill", axis=0)
+            series = torch.tensor(series.values, dtype=torch.float, device=config.DEVICE)
+            self._cache[key] = series
+
+        return series[len(self._dates) - len(self.price(ticker)) :]
+
     def len(self, ticker) -> int:
         """Количество доступных примеров для данного тикера."""
         return max(0, len(self.price(ticker)) - self.history_days - FORECAST_DAYS + 1)
@@ -142,13 +186,17 @@ class TrainParams(DataParams):
 
 
 class TestParams(DataParams):
-    """Параметры для тестирования."""
+    """Параметры для тестирования.
+
+    Для каждого тикера формируются примеры для test_days последних дат, которые совпадают с примерами при
+    тестировании на каждую из этих дат по отдельности.
+    """
 
     def _div_price(self, tickers, end) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        history_days = self.history_days
+        start = self.history_days + self.test_days - 1
         div, price, train_size = div_price_train_size(tickers, end)
-        div = div.iloc[train_size - history_days :]
-        price = price.iloc[train_size - history_days :]
+        div = div.iloc[train_size - start :]
+        price = price.iloc[train_size - start :]
 
         return div, price
 
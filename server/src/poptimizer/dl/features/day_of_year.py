@@ -5,10 +5,10 @@ import torch
 
 from poptimizer.config import DEVICE
 from poptimizer.dl.features.data_params import DataParams
-from poptimizer.dl.features.feature import Feature, FeatureType
+from poptimizer.dl.features.feature import FeatureType, WindowFeature
 
 
-class DayOfYear(Feature):
+class DayOfYear(WindowFeature):
     """Номер дня в году начиная с нуля для каждого момента времени.
 
     Выплаты дивидендов сконцентрированы в определенные периода времени, а доходности имеют аномалии,
@@ -21,10 +21,10 @@ class DayOfYear(Feature):
         day_of_year = params.price(ticker).index.dayofyear - 1
         self.day_of_year = torch.tensor(day_of_year, dtype=torch.long, device=DEVICE)
 
-        self.history_days = params.history_days
-
-    def __getitem__(self, item: int) -> torch.Tensor:
-        return self.day_of_year[item : item + self.history_days]
+    @property
+    def series(self) -> torch.Tensor:
+        """Номера дней в году для всех дат."""
+        return self.day_of_year
 
     @property
     def type_and_size(self) -> Tuple[FeatureType, int]:
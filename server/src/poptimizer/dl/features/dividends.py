@@ -1,28 +1,37 @@
 """Динамика накопленных дивидендов нормированная на первоначальную цену."""
-from typing import Tuple
-
 import torch
 
 from poptimizer.config import DEVICE
 from poptimizer.dl.features.data_params import DataParams
-from poptimizer.dl.features.feature import Feature, FeatureType
+from poptimizer.dl.features.feature import SequenceFeature
+
 
+class Dividends(SequenceFeature):
+    """Динамика накопленных дивидендов нормированная на первоначальную цену.
 
-class Dividends(Feature):
-    """Динамика накопленных дивидендов нормированная на первоначальную цену."""
+    Накопленные дивиденды рассчитываются один раз для всего ряда, а дивиденды, накопленные в окне, получаются
+    вычитанием накопленных до начала окна.
+    """
 
     def __init__(self, ticker: str, params: DataParams):
         super().__init__(ticker, params)
-        self.div = torch.tensor(params.div(ticker).values, dtype=torch.float, device=DEVICE)
+        div = torch.tensor(params.div(ticker).values, dtype=torch.float, device=DEVICE)
+        # Накопленная сумма только растет, поэтому хранится в float32 как и сдвиг, с которым она сокращается
+        self.cum_div = torch.cumsum(div, dim=0)
+        self.prev_cum_div = self.cum_div - div
         self.price = torch.tensor(params.price(ticker).values, dtype=torch.float, device=DEVICE)
-        self.history_days = params.history_days
 
-    def __getitem__(self, item: int) -> torch.Tensor:
-        return (
-            self.div[item : item + self.history_days].cumsum(dim=0) / self.price[item]
-        )
+    @property
+    def series(self) -> torch.Tensor:
+        """Накопленные дивиденды для всех дат."""
+        return self.cum_div
+
+    @property
+    def shift(self) -> torch.Tensor:
+        """Сдвиг окна — дивиденды, накопленные до его начальной позиции."""
+        return self.prev_cum_div
 
     @property
-    def type_and_size(self) -> Tuple[FeatureType, int]:
-        """Тип признака и размер признака."""
-        return FeatureType.SEQUENCE, self.history_days
+    def scale(self) -> torch.Tensor:
+        """Масштаб окна — цена в начальной позиции."""
+        return self.price
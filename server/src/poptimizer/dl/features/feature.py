@@ -1,8 +1,10 @@
 """Абстрактный класс признака."""
 import abc
 import enum
+import functools
 from typing import Tuple
 
+import torch
 from torch import Tensor
 
 from poptimizer.dl.features.data_params import DataParams
@@ -39,3 +41,54 @@ class Feature(abc.ABC):
     @abc.abstractmethod
     def type_and_size(self) -> Tuple[FeatureType, int]:
         """Тип признака и размер признака."""
+
+
+class WindowFeature(Feature):
+    """Абстрактный класс признака, значение которого — окно исходного ряда длиной в историю.
+
+    Окна всех примеров нарезаются из одного исходного ряда, что позволяет формировать батчи одной выборкой из ряда.
+    """
+
+    def __init__(self, ticker: str, params: DataParams):
+        """Сохраняет длину окна истории."""
+        super().__init__(ticker, params)
+        self.history_days = params.history_days
+
+    @property
+    @abc.abstractmethod
+    def series(self) -> Tensor:
+        """Исходный ряд значений признака для всех дат."""
+
+    def __getitem__(self, item: int) -> Tensor:
+        """Окно исходного ряда."""
+        return self.series[item : item + self.history_days]
+
+
+class SequenceFeature(WindowFeature):
+    """Абстрактный класс численной последовательности — одного канала входа сети.
+
+    Окна всех последовательностей тикера нарезаются из исходных рядов одним срезом. Окно, начинающееся с позиции item,
+    нормируется как (series - shift[item]) / scale[item], где сдвиг и масштаб рассчитываются один раз при создании
+    признака, поэтому нормировка окон всех каналов сводится к одной векторной операции.
+    """
+
+    @functools.cached_property
+    def shift(self) -> Tensor:
+        """Сдвиг окна в зависимости от его начальной позиции — по умолчанию отсутствует."""
+        return torch.zeros(len(self.series), device=self.series.device)
+
+    @functools.cached_property
+    def scale(self) -> Tensor:
+        """Масштаб окна в зависимости от его начальной позиции — по умолчанию единичный."""
+        return torch.ones(len(self.series), device=self.series.device)
+
+    def __getitem__(self, item: int) -> Tensor:
+        """Нормированное окно исходного ряда."""
+        window = super().__getitem__(item).float()
+
+        return (window - self.shift[item]) / self.scale[item]
+
+    @property
+    def type_and_size(self) -> Tuple[FeatureType, int]:
+        """Тип признака и размер признака."""
+        return FeatureType.SEQUENCE, self.history_days
@@ -1,15 +1,17 @@
 """Динамика основного индекса MOEX (без дивидендов)."""
-from typing import Tuple
+import functools
 
 import torch
 
-from poptimizer.config import DEVICE
 from poptimizer.data.views import indexes
 from poptimizer.dl.features.data_params import DataParams
-from poptimizer.dl.features.feature import Feature, FeatureType
+from poptimizer.dl.features.feature import SequenceFeature
 
+# Ключ для хранения данных индекса IMOEX в кеше параметров данных
+IMOEX_KEY = "imoex"
 
-class IMOEX(Feature):
+
+class IMOEX(SequenceFeature):
     """Динамика основного индекса MOEX нормированная на начальную дату.
 
     Динамика индекса отражает общую рыночную конъюнктуру, в рамках которой осуществляется
@@ -19,20 +21,19 @@ class IMOEX(Feature):
 
     def __init__(self, ticker: str, params: DataParams):
         super().__init__(ticker, params)
-        imoex = indexes.imoex(params.end)
-        price = params.price(ticker)
-        imoex = imoex.reindex(
-            price.index,
-            method="ffill",
-            axis=0,
-        )
-        self.imoex = torch.tensor(imoex.values, dtype=torch.float, device=DEVICE)
-        self.history_days = params.history_days
-
-    def __getitem__(self, item: int) -> torch.Tensor:
-        return self.imoex[item : item + self.history_days] / self.imoex[item] - 1
+        self.imoex = params.shared_series(ticker, IMOEX_KEY, lambda: indexes.imoex(params.end))
 
     @property
-    def type_and_size(self) -> Tuple[FeatureType, int]:
-        """Тип признака и размер признака."""
-        return FeatureType.SEQUENCE, self.history_days
+    def series(self) -> torch.Tensor:
+        """Исходный ряд значений признака для всех дат."""
+        return self.imoex
+
+    @functools.cached_property
+    def shift(self) -> torch.Tensor:
+        """Сдвиг окна — значение индекса в начальной позиции."""
+        return self.imoex.float()
+
+    @functools.cached_property
+    def scale(self) -> torch.Tensor:
+        """Масштаб окна — значение индекса в начальной позиции."""
+        return self.imoex.float()
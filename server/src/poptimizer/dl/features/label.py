@@ -9,31 +9,32 @@ from poptimizer.dl.features.feature import Feature, FeatureType
 
 
 class Label(Feature):
-    """Метка - полная доходность за определенный период."""
+    """Метка - полная доходность за определенный период.
+
+    Метки для всех примеров тикера рассчитываются при создании признака одной векторной операцией.
+    """
 
     def __init__(self, ticker: str, params: data_params.DataParams):
         super().__init__(ticker, params)
         div = torch.tensor(params.div(ticker).values, dtype=torch.float, device=DEVICE)
-        self.cum_div = torch.cumsum(div, dim=0)
-        self.price = torch.tensor(params.price(ticker).values, dtype=torch.float, device=DEVICE)
-        self.history_days = params.history_days
-
-    def __getitem__(self, item: int) -> torch.Tensor:
-        price = self.price
-        div = self.cum_div
+        cum_div = torch.cumsum(div, dim=0)
+        price = torch.tensor(params.price(ticker).values, dtype=torch.float, device=DEVICE)
 
-        start = item + self.history_days - 1
-        last_history_price = price[start]
-        last_history_div = div[start]
+        start = params.history_days - 1
+        end = start + params.len(ticker)
+        last_history_price = price[start:end]
+        last_history_div = cum_div[start:end]
 
-        end = start + data_params.FORECAST_DAYS
-        last_forecast_price = price[end]
-        last_forecast_div = div[end]
+        last_forecast_price = price[start + data_params.FORECAST_DAYS : end + data_params.FORECAST_DAYS]
+        last_forecast_div = cum_div[start + data_params.FORECAST_DAYS : end + data_params.FORECAST_DAYS]
 
         div = last_forecast_div - last_history_div
         price_growth = last_forecast_price - last_history_price
         label = (price_growth * (1 - FORECAST_DIV) + div) / last_history_price
-        return label.reshape(-1)
+        self.labels = label.reshape(-1, 1)
+
+    def __getitem__(self, item: int) -> torch.Tensor:
+        return self.labels[item]
 
     @property
     def type_and_size(self) -> Tuple[FeatureType, int]:
@@ -1,14 +1,16 @@
 """Динамика минимальной цены."""
+import functools
+
 import torch
 
 from poptimizer.config import DEVICE
 from poptimizer.data.views import quotes
 from poptimizer.dl.features.data_params import DataParams
-from poptimizer.dl.features.feature import Feature, FeatureType
+from poptimizer.dl.features.feature import SequenceFeature
 from poptimizer.shared import col
 
 
-class Low(Feature):
+class Low(SequenceFeature):
     """Динамика минимальной цены, нормированная на начальную цену закрытия.
 
     Минимальная цена содержит дополнительную информацию о динамике стоимости актива и его внутридневной
@@ -26,12 +28,18 @@ class Low(Feature):
         )
         self.low = torch.tensor(p_low.values, dtype=torch.float, device=DEVICE)
         self.price = torch.tensor(params.price(ticker).values, dtype=torch.float, device=DEVICE)
-        self.history_days = params.history_days
-
-    def __getitem__(self, item: int) -> torch.Tensor:
-        return self.low[item : item + self.history_days] / self.price[item] - 1
 
     @property
-    def type_and_size(self) -> tuple[FeatureType, int]:
-        """Тип признака и размер признака."""
-        return FeatureType.SEQUENCE, self.history_days
+    def series(self) -> torch.Tensor:
+        """Исходный ряд значений признака для всех дат."""
+        return self.low
+
+    @functools.cached_property
+    def shift(self) -> torch.Tensor:
+        """Сдвиг окна — цена закрытия в начальной позиции."""
+        return self.price.float()
+
+    @functools.cached_property
+    def scale(self) -> torch.Tensor:
+        """Масштаб окна — цена закрытия в начальной позиции."""
+        return self.price.float()
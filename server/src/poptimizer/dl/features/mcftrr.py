@@ -1,15 +1,17 @@
 """Динамика индекса волатильности MCFTRR."""
-from typing import Tuple
+import functools
 
 import torch
 
-from poptimizer.config import DEVICE
 from poptimizer.data.views import indexes
 from poptimizer.dl.features.data_params import DataParams
-from poptimizer.dl.features.feature import Feature, FeatureType
+from poptimizer.dl.features.feature import SequenceFeature
 
+# Ключ для хранения данных индекса MCFTRR в кеше параметров данных
+MCFTRR_KEY = "mcftrr"
 
-class MCFTRR(Feature):
+
+class MCFTRR(SequenceFeature):
     """Динамика индекса полной доходности MCFTRR нормированная на начальную дату.
 
     Динамика индекса отражает общую рыночную конъюнктуру, в рамках которой осуществляется
@@ -18,20 +20,19 @@ class MCFTRR(Feature):
 
     def __init__(self, ticker: str, params: DataParams):
         super().__init__(ticker, params)
-        mcftrr = indexes.mcftrr(params.end)
-        price = params.price(ticker)
-        mcftrr = mcftrr.reindex(
-            price.index,
-            method="ffill",
-            axis=0,
-        )
-        self.mcftrr = torch.tensor(mcftrr.values, dtype=torch.float, device=DEVICE)
-        self.history_days = params.history_days
-
-    def __getitem__(self, item: int) -> torch.Tensor:
-        return self.mcftrr[item : item + self.history_days] / self.mcftrr[item] - 1
+        self.mcftrr = params.shared_series(ticker, MCFTRR_KEY, lambda: indexes.mcftrr(params.end))
 
     @property
-    def type_and_size(self) -> Tuple[FeatureType, int]:
-        """Тип признака и размер признака."""
-        return FeatureType.SEQUENCE, self.history_days
+    def series(self) -> torch.Tensor:
+        """Исходный ряд значений признака для всех дат."""
+        return self.mcftrr
+
+    @functools.cached_property
+    def shift(self) -> torch.Tensor:
+        """Сдвиг окна — значение индекса в начальной позиции."""
+        return self.mcftrr.float()
+
+    @functools.cached_property
+    def scale(self) -> torch.Tensor:
+        """Масштаб окна — значение индекса в начальной позиции."""
+        return self.mcftrr.float()
@@ -1,33 +1,34 @@
 """Динамика индекса полной доходности нефтегазовых акций MEOGTRR."""
-from typing import Tuple
+import functools
 
 import torch
 
-from poptimizer.config import DEVICE
 from poptimizer.data.views import indexes
 from poptimizer.dl.features.data_params import DataParams
-from poptimizer.dl.features.feature import Feature, FeatureType
+from poptimizer.dl.features.feature import SequenceFeature
 
+# Ключ для хранения данных индекса MEOGTRR в кеше параметров данных
+MEOGTRR_KEY = "meogtrr"
 
-class MEOGTRR(Feature):
+
+class MEOGTRR(SequenceFeature):
     """Динамика индекса полной доходности нефтегазовых акций MEOGTRR нормированная на начальную дату."""
 
     def __init__(self, ticker: str, params: DataParams):
         super().__init__(ticker, params)
-        index = indexes.index("MEOGTRR", params.end)
-        price = params.price(ticker)
-        index = index.reindex(
-            price.index,
-            method="ffill",
-            axis=0,
-        )
-        self.index = torch.tensor(index.values, dtype=torch.float, device=DEVICE)
-        self.history_days = params.history_days
-
-    def __getitem__(self, item: int) -> torch.Tensor:
-        return self.index[item : item + self.history_days] / self.index[item] - 1
+        self.index = params.shared_series(ticker, MEOGTRR_KEY, lambda: indexes.index("MEOGTRR", params.end))
 
     @property
-    def type_and_size(self) -> Tuple[FeatureType, int]:
-        """Тип признака и размер признака."""
-        return FeatureType.SEQUENCE, self.history_days
+    def series(self) -> torch.Tensor:
+        """Исходный ряд значений признака для всех дат."""
+        return self.index
+
+    @functools.cached_property
+    def shift(self) -> torch.Tensor:
+        """Сдвиг окна — значение индекса в начальной позиции."""
+        return self.index.float()
+
+    @functools.cached_property
+    def scale(self) -> torch.Tensor:
+        """Масштаб окна — значение индекса в начальной позиции."""
+        return self.index.float()
@@ -1,27 +1,31 @@
 """Динамика изменения цены нормированная на первоначальную цену."""
-from typing import Tuple
+import functools
 
 import torch
 
 from poptimizer.config import DEVICE
 from poptimizer.dl.features.data_params import DataParams
-from poptimizer.dl.features.feature import Feature, FeatureType
+from poptimizer.dl.features.feature import SequenceFeature
 
 
-class Prices(Feature):
+class Prices(SequenceFeature):
     """Динамика изменения цены нормированная на первоначальную цену."""
 
     def __init__(self, ticker: str, params: DataParams):
         super().__init__(ticker, params)
         self.price = torch.tensor(params.price(ticker).values, dtype=torch.float, device=DEVICE)
-        self.history_days = params.history_days
-
-    def __getitem__(self, item: int) -> torch.Tensor:
-        history_days = self.history_days
-        price = self.price
-        return price[item : item + history_days] / price[item] - 1
 
     @property
-    def type_and_size(self) -> Tuple[FeatureType, int]:
-        """Тип признака и размер признака."""
-        return FeatureType.SEQUENCE, self.history_days
+    def series(self) -> torch.Tensor:
+        """Исходный ряд значений признака для всех дат."""
+        return self.price
+
+    @functools.cached_property
+    def shift(self) -> torch.Tensor:
+        """Сдвиг окна — цена в начальной позиции."""
+        return self.price.float()
+
+    @functools.cached_property
+    def scale(self) -> torch.Tensor:
+        """Масштаб окна — цена в начальной позиции."""
+        return self.price.float()
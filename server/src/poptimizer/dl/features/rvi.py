@@ -1,15 +1,15 @@
 """Динамика индекса волатильности RVI."""
-from typing import Tuple
-
 import torch
 
-from poptimizer.config import DEVICE
 from poptimizer.data.views import indexes
 from poptimizer.dl.features.data_params import DataParams
-from poptimizer.dl.features.feature import Feature, FeatureType
+from poptimizer.dl.features.feature import SequenceFeature
+
+# Ключ для хранения данных индекса RVI в кеше параметров данных
+RVI_KEY = "rvi"
 
 
-class RVI(Feature):
+class RVI(SequenceFeature):
     """Динамика индекса волатильности RVI.
 
     Индекс отражает ожидание участников рынка относительно волатильности в ближайший месяц, что может
@@ -18,20 +18,9 @@ class RVI(Feature):
 
     def __init__(self, ticker: str, params: DataParams):
         super().__init__(ticker, params)
-        rvi = indexes.rvi(params.end)
-        price = params.price(ticker)
-        rvi = rvi.reindex(
-            price.index,
-            method="ffill",
-            axis=0,
-        )
-        self.rvi = torch.tensor(rvi.values, dtype=torch.float, device=DEVICE)
-        self.history_days = params.history_days
-
-    def __getitem__(self, item: int) -> torch.Tensor:
-        return self.rvi[item : item + self.history_days]
+        self.rvi = params.shared_series(ticker, RVI_KEY, lambda: indexes.rvi(params.end))
 
     @property
-    def type_and_size(self) -> Tuple[FeatureType, int]:
-        """Тип признака и размер признака."""
-        return FeatureType.SEQUENCE, self.history_days
+    def series(self) -> torch.Tensor:
+        """Исходный ряд значений признака для всех дат."""
+        return self.rvi
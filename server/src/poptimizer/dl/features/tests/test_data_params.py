@@ -146,3 +146,42 @@ class TestForecastParams:
 
     def test_get_all_feat(self, forecast_params):
         assert list(forecast_params.get_all_feat()) == ["Prices"]
+
+
+class FakeParams(data_params.DataParams):
+    def _div_price(self, tickers, end):
+        index = pd.bdate_range("2020-01-01", periods=6)
+        price = pd.DataFrame({"AAA": [1, 2, 3, 4, 5, 6], "BBB": [None, None, 3, 4, 5, 6]}, index=index, dtype=float)
+
+        return price * 0, price
+
+
+def test_shared_series():
+    params = FakeParams(("AAA", "BBB"), pd.Timestamp("2020-01-08"), PARAMS | {"precision": "float32"})
+    index = pd.Series([10.0, 20.0, 30.0], index=pd.to_datetime(["2019-12-31", "2020-01-02", "2020-01-06"]))
+    loads = []
+
+    def load():
+        loads.append(1)
+        return index
+
+    aaa = params.shared_series("AAA", "index", load)
+    bbb = params.shared_series("BBB", "index", load)
+
+    assert aaa.tolist() == [10, 20, 20, 30, 30, 30]
+    assert bbb.tolist() == [20, 30, 30, 30]
+    assert len(loads) == 1
+
+
+def test_test_params_many_days(monkeypatch):
+    index = pd.bdate_range("2020-01-01", periods=40)
+    price = pd.DataFrame({"AAA": range(1, 41)}, index=index, dtype=float)
+    monkeypatch.setattr(data_params, "FORECAST_DAYS", 5)
+    monkeypatch.setattr(data_params, "div_price_train_size", lambda tickers, end: (price * 0, price, 35))
+
+    params = data_params.TestParams(("AAA",), index[-1], PARAMS | {"test_days": 3})
+
+    assert params.test_days == 3
+    assert params.len("AAA") == 3
+    assert params.dates[-3:].tolist() == index[-3:].tolist()
+    assert params.price("AAA").iloc[0] == 35 - 16 - 2 + 1
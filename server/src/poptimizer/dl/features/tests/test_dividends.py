@@ -46,3 +46,45 @@ class TestLabel:
 
     def test_type_and_size(self, feature):
         assert feature.type_and_size == (FeatureType.SEQUENCE, 8)
+
+
+class FakeParams:
+    history_days = 4
+    feature_dtype = torch.float
+
+    def __init__(self):
+        index = pd.bdate_range("2020-01-01", periods=8)
+        self._div = pd.Series([0, 1, 0, 0, 2, 0, 3, 0], index=index, dtype=float)
+        self._price = pd.Series([10, 11, 12, 13, 14, 15, 16, 17], index=index, dtype=float)
+
+    def div(self, ticker):
+        return self._div
+
+    def price(self, ticker):
+        return self._price
+
+
+def test_window_from_cumulative_dividends():
+    params = FakeParams()
+    feature = dividends.Dividends("AAA", params)
+    div = torch.tensor(params.div("AAA").values, dtype=torch.float)
+    price = torch.tensor(params.price("AAA").values, dtype=torch.float)
+
+    for item in range(5):
+        expected = div[item : item + 4].cumsum(dim=0) / price[item]
+        assert feature[item].allclose(expected)
+
+
+def test_large_cumulative_dividends_in_reduced_precision():
+    params = FakeParams()
+    params.feature_dtype = data_params.FEATURE_DTYPES["bfloat16"]
+    params._div = params._div.where(params._div == 0, 40000.5)
+    feature = dividends.Dividends("AAA", params)
+    div = torch.tensor(params.div("AAA").values, dtype=torch.float64)
+    price = torch.tensor(params.price("AAA").values, dtype=torch.float64)
+
+    for item in range(5):
+        expected = div[item : item + 4].cumsum(dim=0) / price[item]
+
+        assert torch.isfinite(feature[item]).all()
+        assert feature[item].double().allclose(expected)
@@ -32,3 +32,36 @@ class TestLabel:
 
     def test_type_and_size(self, feature):
         assert feature.type_and_size == (FeatureType.LABEL, 4)
+
+
+class FakeParams:
+    history_days = 3
+
+    def __init__(self):
+        index = pd.bdate_range("2020-01-01", periods=30)
+        self._div = pd.Series(0.0, index=index)
+        self._div.iloc[[5, 17, 18]] = [1.0, 2.0, 0.5]
+        self._price = pd.Series(range(10, 40), index=index, dtype=float)
+
+    def div(self, ticker):
+        return self._div
+
+    def price(self, ticker):
+        return self._price
+
+    def len(self, ticker):
+        return len(self._price) - self.history_days - data_params.FORECAST_DAYS + 1
+
+
+def test_labels_match_scalar_formula():
+    params = FakeParams()
+    feature = label.Label("AAA", params)
+    price = params.price("AAA").values
+    cum_div = params.div("AAA").cumsum().values
+
+    assert feature.labels.shape == (params.len("AAA"), 1)
+    for item in range(params.len("AAA")):
+        start = item + params.history_days - 1
+        end = start + data_params.FORECAST_DAYS
+        growth = (price[end] - price[start]) * (1 - label.FORECAST_DIV) + cum_div[end] - cum_div[start]
+        assert feature[item].item() == pytest.approx(growth / price[start], rel=1e-6)
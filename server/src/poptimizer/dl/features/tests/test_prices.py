@@ -45,3 +45,24 @@ class TestLabel:
 
     def test_type_and_size(self, feature):
         assert feature.type_and_size == (FeatureType.SEQUENCE, 8)
+
+
+class FakeParams:
+    history_days = 4
+    feature_dtype = data_params.FEATURE_DTYPES["bfloat16"]
+
+    def price(self, ticker):
+        return pd.Series([70000.0, 70010.0, 70035.0, 69990.0, 120000.5], index=pd.bdate_range("2020-01-01", periods=5))
+
+
+def test_large_prices_in_reduced_precision():
+    params = FakeParams()
+    feature = prices.Prices("AAA", params)
+    price = torch.tensor(params.price("AAA").values, dtype=torch.float64)
+
+    for item in range(2):
+        window = feature[item]
+        expected = price[item : item + 4] / price[item] - 1
+
+        assert torch.isfinite(window).all()
+        assert window.double().allclose(expected, rtol=0, atol=1e-6)
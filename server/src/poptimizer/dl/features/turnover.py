@@ -1,6 +1,4 @@
 """Динамика оборота."""
-from typing import Tuple
-
 import numpy as np
 import torch
 
@@ -8,14 +6,14 @@ import poptimizer.data.views.quotes
 from poptimizer.config import DEVICE
 from poptimizer.data.views import listing
 from poptimizer.dl.features.data_params import DataParams
-from poptimizer.dl.features.feature import Feature, FeatureType
+from poptimizer.dl.features.feature import SequenceFeature
 
 # Ключ для хранения данных оборота в кеше параметров данных
 TURNOVER = "turnover"
 AVERAGE_TURNOVER = "average_turnover"
 
 
-class Turnover(Feature):
+class Turnover(SequenceFeature):
     """Динамика логарифма 1 + оборот."""
 
     def __init__(self, ticker: str, params: DataParams):
@@ -30,19 +28,15 @@ class Turnover(Feature):
         price = params.price(ticker)
         turnover = turnover.reindex(price.index, axis=0)
         turnover = torch.tensor(turnover.values, dtype=torch.float, device=DEVICE)
-        self.turnover = torch.log1p(turnover)
-        self.history_days = params.history_days
-
-    def __getitem__(self, item: int) -> torch.Tensor:
-        return self.turnover[item : item + self.history_days]
+        self.turnover = torch.log1p(turnover).to(params.feature_dtype)
 
     @property
-    def type_and_size(self) -> Tuple[FeatureType, int]:
-        """Тип признака и размер признака."""
-        return FeatureType.SEQUENCE, self.history_days
+    def series(self) -> torch.Tensor:
+        """Исходный ряд значений признака для всех дат."""
+        return self.turnover
 
 
-class AverageTurnover(Feature):
+class AverageTurnover(SequenceFeature):
     """Динамика логарифма 1 + среднего оборота всех бумаг портфеля.
 
     Использование этого фактора совместно с фактором оборота позволяет выделять вспышки оборота
@@ -63,13 +57,9 @@ class AverageTurnover(Feature):
 
         price = params.price(ticker)
         turnover = turnover.reindex(price.index, axis=0)
-        self.turnover = torch.tensor(turnover.values, dtype=torch.float, device=DEVICE)
-        self.history_days = params.history_days
-
-    def __getitem__(self, item: int) -> torch.Tensor:
-        return self.turnover[item : item + self.history_days]
+        self.turnover = torch.tensor(turnover.values, dtype=params.feature_dtype, device=DEVICE)
 
     @property
-    def type_and_size(self) -> Tuple[FeatureType, int]:
-        """Тип признака и размер признака."""
-        return FeatureType.SEQUENCE, self.history_days
+    def series(self) -> torch.Tensor:
+        """Исходный ряд значений признака для всех дат."""
+        return self.turnover
@@ -1,15 +1,17 @@
 """Динамика индекса курса доллара."""
-from typing import Tuple
+import functools
 
 import torch
 
-from poptimizer.config import DEVICE
 from poptimizer.data.views import indexes
 from poptimizer.dl.features.data_params import DataParams
-from poptimizer.dl.features.feature import Feature, FeatureType
+from poptimizer.dl.features.feature import SequenceFeature
 
+# Ключ для хранения данных курса доллара в кеше параметров данных
+USD_KEY = "usd"
 
-class USD(Feature):
+
+class USD(SequenceFeature):
     """Динамика индекса доллара нормированная на начальную дату.
 
     Иностранные и российские бумаги могут существенно по разному реагировать на сильные движения курса
@@ -19,20 +21,19 @@ class USD(Feature):
     def __init__(self, ticker: str, params: DataParams):
         """Сохраняет данные о курсе."""
         super().__init__(ticker, params)
-        usd = indexes.usd(params.end)
-        price = params.price(ticker)
-        usd = usd.reindex(
-            price.index,
-            method="ffill",
-            axis=0,
-        )
-        self.usd = torch.tensor(usd.values, dtype=torch.float, device=DEVICE)
-        self.history_days = params.history_days
-
-    def __getitem__(self, item: int) -> torch.Tensor:
-        return self.usd[item : item + self.history_days] / self.usd[item] - 1
+        self.usd = params.shared_series(ticker, USD_KEY, lambda: indexes.usd(params.end))
 
     @property
-    def type_and_size(self) -> Tuple[FeatureType, int]:
-        """Тип признака и размер признака."""
-        return FeatureType.SEQUENCE, self.history_days
+    def series(self) -> torch.Tensor:
+        """Исходный ряд значений признака для всех дат."""
+        return self.usd
+
+    @functools.cached_property
+    def shift(self) -> torch.Tensor:
+        """Сдвиг окна — курс в начальной позиции."""
+        return self.usd.float()
+
+    @functools.cached_property
+    def scale(self) -> torch.Tensor:
+        """Масштаб окна — курс в начальной позиции."""
+        return self.usd.float()
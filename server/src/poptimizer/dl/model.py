@@ -3,8 +3,10 @@ import collections
 import io
 import itertools
 import logging
+import pathlib
 import sys
-from typing import Final, Optional, Callable
+import time
+from typing import Any, Final, Optional, Callable
 
 import numpy as np
 import pandas as pd
@@ -24,8 +26,14 @@ from poptimizer.dl.models.wave_net import GradientsError, ModelError
 # Ограничение на максимальное снижение правдоподобия во время обучения для его прерывания
 LLH_DRAW_DOWN = 1
 
-# Максимальный размер документа в MongoDB
-MAX_DOC_SIZE: Final = 2 * (2**10) ** 2
+# Доля шагов обучения, после которой оценивается перспективность модели
+SCREENING_SHARE: Final = 0.25
+
+# Веса эмбендинга тикеров, требующие перестановки при изменении их состава
+TICKER_EMBEDDING: Final = "embedding_dict.Ticker.weight"
+
+# Максимальное количество параметров модели — веса хранятся в GridFS и не ограничены размером документа MongoDB
+MAX_MODEL_PARAMS: Final = 16 * (2**10) ** 2
 
 # Максимальный размер батча GB
 MAX_BATCH_SIZE: Final = 150
@@ -45,7 +53,7 @@ class TooLongHistoryError(ModelError):
 class TooLargeModelError(ModelError):
     """Слишком большая модель.
 
-    Модель с 2 млн параметров не может быть сохранена.
+    Модель с более чем 16 млн параметров обучается слишком долго.
     """
 
 
@@ -53,18 +61,42 @@ class DegeneratedModelError(ModelError):
     """В модели отключены все признаки."""
 
 
+class DeadlineError(config.POptimizerError):
+    """Обучение прервано по истечении отведенного времени.
+
+    Состояние обучения сохранено в контрольной точке и будет восстановлено при следующем обучении модели.
+    """
+
+
+class ScreeningError(ModelError):
+    """Неперспективная модель.
+
+    Правдоподобие на обучении после части шагов ниже порогового значения — обучение прерывается досрочно.
+    """
+
+
 def log_normal_llh_mix(
     model: nn.Module,
     batch: dict[str, torch.Tensor],
 ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
     """Minus Normal Log Likelihood and forecast means."""
+    llh, mean, var = _log_normal_llh(model, batch)
+
+    return -llh.sum(), mean, var
+
+
+def _log_normal_llh(
+    model: nn.Module,
+    batch: dict[str, torch.Tensor],
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Normal Log Likelihood and forecast means for each example."""
     dist = model.dist(batch)
     try:
         llh = dist.log_prob(batch["Label"] + torch.tensor(1.0))
     except ValueError:
         raise GradientsError(f"Wrong bound in Categorical distribution")
 
-    return -llh.sum(), dist.mean - torch.tensor(1.0), dist.variance
+    return llh, dist.mean - torch.tensor(1.0), dist.variance
 
 
 class Model:
@@ -76,6 +108,11 @@ class Model:
         end: pd.Timestamp,
         phenotype: data_loader.PhenotypeData,
         pickled_model: Optional[bytes] = None,
+        screening_llh: Optional[float] = None,
+        warm_start: Optional[tuple[bytes, tuple[str, ...]]] = None,
+        *,
+        checkpoint: Optional[pathlib.Path] = None,
+        deadline: Optional[float] = None,
     ):
         """Сохраняет необходимые данные.
 
@@ -87,11 +124,30 @@ class Model:
             Параметры данных, модели, оптимизатора и политики обучения.
         :param pickled_model:
             Сохраненные параметры для натренированной модели.
+        :param screening_llh:
+            Минимальное правдоподобие на обучении после SCREENING_SHARE шагов, необходимое для продолжения обучения.
+            При отсутствии обучение проводится полностью.
+        :param warm_start:
+            Сохраненные параметры ранее обученной модели и тикеры, на которых она обучалась. При наличии обучение
+            начинается с этих весов и длится WARM_START_EPOCHS от количества эпох в генотипе.
+        :param checkpoint:
+            Файл для периодического сохранения состояния обучения. При наличии сохраненного состояния для тех же
+            данных обучение продолжается с него, а после завершения обучения файл удаляется.
+        :param deadline:
+            Время окончания обучения в секундах от начала эпохи. После него обучение прерывается с сохранением
+            состояния в контрольной точке.
         """
         self._tickers = tickers
         self._end = end
         self._phenotype = phenotype
         self._pickled_model = pickled_model
+        self._screening_llh = screening_llh
+        self._proxy_llh = None
+        self._warm_start = warm_start
+        self._warm_started = False
+        self._checkpoint = checkpoint
+        self._deadline = deadline
+        self._restored_ns = 0
         self._model = None
         self._llh = None
 
@@ -106,6 +162,8 @@ class Model:
         buffer = io.BytesIO()
         self._model.to("cpu")
         state_dict = self._model.state_dict()
+        if config.WEIGHTS_FLOAT16:
+            state_dict = {key: _to_half(tensor) for key, tensor in state_dict.items()}
         torch.save(state_dict, buffer)
         return buffer.getvalue()
 
@@ -114,12 +172,38 @@ class Model:
         """Логарифм правдоподобия."""
         if self._llh is None:
             try:
-                self._llh = self._eval_llh()
+                (self._llh,) = self._eval_llh().values()
             except TypeError:
                 raise DegeneratedModelError
 
         return self._llh
 
+    def quality_metrics_history(self, days: int) -> dict[pd.Timestamp, tuple[float, float]]:
+        """Логарифм правдоподобия и доходность для days последних дат до конечной даты включительно.
+
+        Примеры для всех дат формируются одним загрузчиком и оцениваются за один проход сети, а результаты совпадают с
+        оценкой модели отдельно на каждую из дат.
+        """
+        try:
+            return self._eval_llh(days)
+        except TypeError:
+            raise DegeneratedModelError
+
+    @property
+    def proxy_llh(self) -> Optional[float]:
+        """Правдоподобие на обучении после SCREENING_SHARE шагов — дешевая оценка перспективности модели."""
+        return self._proxy_llh
+
+    @property
+    def warm_started(self) -> bool:
+        """Обучение началось с весов ранее обученной модели."""
+        return self._warm_started
+
+    @property
+    def restored_ns(self) -> int:
+        """Время обучения в наносекундах до сохранения контрольной точки, с которой продолжено обучение."""
+        return self._restored_ns
+
     def prepare_model(self, loader: data_loader.DescribedDataLoader) -> nn.Module:
         """Загрузка или обучение модели."""
         if self._model is not None:
@@ -133,66 +217,84 @@ class Model:
 
         return self._model
 
-    def _eval_llh(self) -> tuple[float, float]:
-        """Вычисляет логарифм правдоподобия.
+    def _eval_llh(self, test_days: int = 1) -> dict[pd.Timestamp, tuple[float, float]]:
+        """Вычисляет логарифм правдоподобия и доходность для test_days последних дат.
 
         Прогнозы пересчитываются в дневное выражение для сопоставимости и вычисляется логарифм
         правдоподобия. Модель загружается при наличии сохраненных весов или обучается с нуля.
         """
-        loader = data_loader.DescribedDataLoader(
-            self._tickers,
-            self._end,
-            self._phenotype["data"],
-            data_params.TestParams,
-        )
+        loader = self._make_loader(data_params.TestParams, test_days=test_days)
 
         n_tickers = len(self._tickers)
-        days, rez = divmod(len(loader.dataset), n_tickers)
-        if rez:
+        if len(loader.dataset) != n_tickers * test_days:
             history = int(self._phenotype["data"]["history_days"])
 
             raise TooLongHistoryError(f"Слишком большая длинна истории - {history}")
 
         model = self.prepare_model(loader)
         model.to(DEVICE)
-        loss_fn = log_normal_llh_mix
 
         llh_sum = 0
         weight_sum = 0
+        all_llh = []
         all_means = []
         all_vars = []
-        all_labels = []
 
         llh_adj = np.log(data_params.FORECAST_DAYS) / 2
         with torch.no_grad():
             model.eval()
             bars = tqdm.tqdm(loader, file=sys.stdout, desc="~~> Test")
             for batch in bars:
-                loss, mean, var = loss_fn(model, batch)
-                llh_sum -= loss.item()
+                llh, mean, var = _log_normal_llh(model, batch)
+                llh_sum += llh.sum().item()
                 weight_sum += mean.shape[0]
+                all_llh.append(llh)
                 all_means.append(mean)
                 all_vars.append(var)
-                all_labels.append(batch["Label"])
 
                 bars.set_postfix_str(f"{llh_sum / weight_sum + llh_adj:.5f}")
 
-        all_means = torch.cat(all_means).cpu().numpy().flatten()
-        all_vars = torch.cat(all_vars).cpu().numpy().flatten()
-        all_labels = torch.cat(all_labels).cpu().numpy().flatten()
-        llh = llh_sum / weight_sum + llh_adj
+        # Примеры упорядочены по тикерам, а внутри тикера — по датам
+        shape = (n_tickers, test_days)
+        all_llh = torch.cat(all_llh).cpu().numpy().reshape(shape)
+        all_means = torch.cat(all_means).cpu().numpy().reshape(shape)
+        all_vars = torch.cat(all_vars).cpu().numpy().reshape(shape)
+        all_labels = loader.labels.cpu().numpy().reshape(shape)
+
+        metrics = {}
+        for day, date in enumerate(loader.dates[-test_days:]):
+            ir = _opt_port(
+                all_means[:, day].copy(),
+                all_vars[:, day].copy(),
+                all_labels[:, day].copy(),
+                self._tickers,
+                date,
+                self._phenotype,
+            )
+            metrics[date] = (all_llh[:, day].sum() / n_tickers + llh_adj, ir)
+
+        return metrics
+
+    @property
+    def _precision(self) -> str:
+        """Точность вычислений при обучении — float32 или bfloat16."""
+        return self._phenotype.get("precision", config.PRECISION)
 
-        ir = _opt_port(
-            all_means,
-            all_vars,
-            all_labels,
+    def _make_loader(
+        self,
+        params_type: type[data_params.DataParams],
+        num_workers: int = 0,
+        test_days: int = 1,
+    ) -> data_loader.DescribedDataLoader:
+        """Загрузчик данных заданного типа с учетом точности хранения признаков."""
+        return data_loader.DescribedDataLoader(
             self._tickers,
             self._end,
-            self._phenotype,
+            self._phenotype["data"] | {"precision": self._precision, "test_days": test_days},
+            params_type,
+            num_workers,
         )
 
-        return llh, ir
-
     def _load_trained_model(
         self,
         pickled_model: bytes,
@@ -203,6 +305,11 @@ class Model:
         buffer = io.BytesIO(pickled_model)
         state_dict = torch.load(buffer)
         model.load_state_dict(state_dict)
+
+        if config.COMPILE_INFERENCE:
+            model.to(DEVICE)
+            model.compile_inference(next(iter(loader)))
+
         return model
 
     def _make_untrained_model(
@@ -213,7 +320,7 @@ class Model:
         model_type = getattr(models, self._phenotype["type"])
         model = model_type(loader.history_days, loader.features_description, **self._phenotype["model"])
 
-        if (n_par := sum(tensor.numel() for tensor in model.parameters())) > MAX_DOC_SIZE:
+        if (n_par := sum(tensor.numel() for tensor in model.parameters())) > MAX_MODEL_PARAMS:
             raise TooLargeModelError(f"Очень много параметров: {n_par}")
 
         return model
@@ -223,12 +330,7 @@ class Model:
         phenotype = self._phenotype
 
         try:
-            loader = data_loader.DescribedDataLoader(
-                self._tickers,
-                self._end,
-                phenotype["data"],
-                data_params.TrainParams,
-            )
+            loader = self._make_loader(data_params.TrainParams, config.DATA_WORKERS)
         except ValueError:
             history = int(self._phenotype["data"]["history_days"])
 
@@ -238,12 +340,15 @@ class Model:
             raise DegeneratedModelError("Отсутствуют активные признаки в генотипе")
 
         model = self._make_untrained_model(loader)
+        self._warm_started = self._load_warm_start(model)
         model.to(DEVICE)
         optimizer = optim.AdamW(model.parameters(), **phenotype["optimizer"])
 
         steps_per_epoch = len(loader)
         scheduler_params = dict(phenotype["scheduler"])
         epochs = scheduler_params.pop("epochs")
+        if self._warm_started:
+            epochs *= config.WARM_START_EPOCHS
         total_steps = 1 + int(steps_per_epoch * epochs)
         scheduler_params["total_steps"] = total_steps
         scheduler = optim.lr_scheduler.OneCycleLR(optimizer, **scheduler_params)
@@ -261,20 +366,43 @@ class Model:
         llh_deque = collections.deque([0], maxlen=steps_per_epoch)
         weight_sum = 0
         weight_deque = collections.deque([0], maxlen=steps_per_epoch)
+        llh_min = None
+        start_step = 0
         loss_fn = log_normal_llh_mix
 
+        training = {"model": model, "optimizer": optimizer, "scheduler": scheduler}
+        if (stats := self._restore_checkpoint(training, total_steps)) is not None:
+            start_step, llh_sum, weight_sum, llh_min, self._proxy_llh, self._restored_ns = (
+                stats["step"],
+                stats["llh_sum"],
+                stats["weight_sum"],
+                stats["llh_min"],
+                stats["proxy_llh"],
+                stats["elapsed_ns"],
+            )
+            llh_deque = collections.deque(stats["llh_deque"], maxlen=steps_per_epoch)
+            weight_deque = collections.deque(stats["weight_deque"], maxlen=steps_per_epoch)
+            LOGGER.info(f"Обучение продолжается с шага {start_step}")
+
+        # Пройденные эпохи и батчи текущей эпохи пропускаются без формирования батчей
+        loader.sampler.skip(start_step % steps_per_epoch)
         loader = itertools.repeat(loader)
         loader = itertools.chain.from_iterable(loader)
-        loader = itertools.islice(loader, total_steps)
+        loader = itertools.islice(loader, total_steps - start_step)
+
+        screening_step = int(total_steps * SCREENING_SHARE)
 
         model.train()
-        bars = tqdm.tqdm(loader, file=sys.stdout, total=total_steps, desc="~~> Train")
-        llh_min = None
+        bars = tqdm.tqdm(loader, file=sys.stdout, total=total_steps, initial=start_step, desc="~~> Train")
         llh_adj = np.log(data_params.FORECAST_DAYS) / 2
-        for batch in bars:
+        autocast = _make_autocast(self._precision)
+        train_start = time.monotonic_ns()
+        saved_at = time.monotonic()
+        for step, batch in enumerate(bars, start_step + 1):
             optimizer.zero_grad()
 
-            loss, means, _ = loss_fn(model, batch)
+            with autocast:
+                loss, means, _ = loss_fn(model, batch)
 
             llh_sum += -loss.item() - llh_deque[0]
             llh_deque.append(-loss.item())
@@ -301,17 +429,134 @@ class Model:
             if not (llh > llh_min):
                 raise GradientsError(f"LLH снизилось - начальное: {llh_min + LLH_DRAW_DOWN:0.5f}")
 
+            if step == screening_step:
+                self._screen(llh)
+
+            deadline_passed = self._deadline is not None and time.time() > self._deadline
+            if deadline_passed or time.monotonic() - saved_at > config.CHECKPOINT_MINUTES * 60:
+                # Статистика сохраняется во встроенных типах Python, которые загружаются в режиме weights_only
+                stats = {
+                    "step": step,
+                    "llh_sum": float(llh_sum),
+                    "llh_deque": [float(llh_step) for llh_step in llh_deque],
+                    "weight_sum": int(weight_sum),
+                    "weight_deque": [int(weight_step) for weight_step in weight_deque],
+                    "llh_min": float(llh_min),
+                    "proxy_llh": None if self._proxy_llh is None else float(self._proxy_llh),
+                    "elapsed_ns": self._restored_ns + time.monotonic_ns() - train_start,
+                }
+                self._save_checkpoint(training, total_steps, stats)
+                saved_at = time.monotonic()
+
+            if deadline_passed:
+                raise DeadlineError(f"Обучение прервано на шаге {step} из {total_steps}")
+
+        if self._checkpoint is not None:
+            self._checkpoint.unlink(missing_ok=True)
+
         return model
 
-    def forecast(self) -> Forecast:
-        """Прогноз годовой доходности."""
-        loader = data_loader.DescribedDataLoader(
-            self._tickers,
-            self._end,
-            self._phenotype["data"],
-            data_params.ForecastParams,
+    def _restore_checkpoint(self, training: dict[str, Any], total_steps: int) -> Optional[dict[str, Any]]:
+        """Восстанавливает состояние модели, оптимизатора и политики обучения из контрольной точки.
+
+        Контрольная точка используется, только если она сохранена для тех же тикеров, даты, количества шагов и
+        размеров весов модели.
+        """
+        if self._checkpoint is None or not self._checkpoint.exists():
+            return None
+
+        state = torch.load(self._checkpoint)
+        if state["key"] != self._checkpoint_key(training, total_steps):
+            LOGGER.info("Контрольная точка не соответствует данным — обучение с начала")
+
+            return None
+
+        for name, component in training.items():
+            component.load_state_dict(state[name])
+
+        return state["stats"]
+
+    def _save_checkpoint(self, training: dict[str, Any], total_steps: int, stats: dict[str, Any]) -> None:
+        """Сохраняет состояние обучения в контрольной точке."""
+        if self._checkpoint is None:
+            return
+
+        state = {name: component.state_dict() for name, component in training.items()}
+        state["key"] = self._checkpoint_key(training, total_steps)
+        state["stats"] = stats
+
+        self._checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._checkpoint.with_suffix(".tmp")
+        torch.save(state, tmp_path)
+        tmp_path.replace(self._checkpoint)
+
+    def _checkpoint_key(self, training: dict[str, Any], total_steps: int) -> tuple[Any, ...]:
+        shapes = tuple(tuple(tensor.shape) for tensor in training["model"].state_dict().values())
+
+        return self._tickers, str(self._end), total_steps, shapes
+
+    def _load_warm_start(self, model: nn.Module) -> bool:
+        """Загружает веса ранее обученной модели.
+
+        Строки эмбендинга тикеров переставляются в соответствии с новым составом тикеров, а для новых тикеров
+        остаются случайными. При несовпадении архитектуры модель обучается с нуля.
+        """
+        if self._warm_start is None:
+            return False
+
+        pickled_model, tickers = self._warm_start
+        state_dict = torch.load(io.BytesIO(pickled_model))
+        init_state_dict = model.state_dict()
+
+        if TICKER_EMBEDDING in state_dict and TICKER_EMBEDDING in init_state_dict:
+            state_dict[TICKER_EMBEDDING] = _remap_embedding(
+                state_dict[TICKER_EMBEDDING],
+                init_state_dict[TICKER_EMBEDDING],
+                tickers,
+                self._tickers,
+            )
+
+        try:
+            model.load_state_dict(state_dict)
+        except RuntimeError as err:
+            LOGGER.warning(f"Обучение с нуля — веса не подходят к модели: {err}")
+
+            return False
+
+        return True
+
+    def _screen(self, llh: float) -> None:
+        """Сохраняет промежуточное правдоподобие и прерывает обучение неперспективной модели.
+
+        Реализует один раунд последовательного деления пополам — продолжают обучение только модели, не уступающие
+        пороговому значению, в качестве которого обычно используется медиана по популяции.
+        """
+        self._proxy_llh = llh
+
+        if self._screening_llh is not None and llh < self._screening_llh:
+            raise ScreeningError(f"Неперспективная модель: {llh:.5f} < {self._screening_llh:.5f}")
+
+    def forecast(self, moments: Optional[tuple[pd.Series, pd.Series]] = None) -> Forecast:
+        """Прогноз годовой доходности.
+
+        При наличии ранее рассчитанных на конечную дату прогнозов доходности и СКО сеть не загружается и не
+        используется.
+        """
+        means, stds = moments or self.forecast_moments()
+
+        return Forecast(
+            tickers=self._tickers,
+            date=self._end,
+            history_days=self._phenotype["data"]["history_days"],
+            mean=means,
+            std=stds,
+            risk_tolerance=self._phenotype["utility"]["risk_tolerance"],
         )
 
+    def forecast_moments(self) -> tuple[pd.Series, pd.Series]:
+        """Прогноз годовой доходности и СКО для каждого тикера на конечную дату."""
+        loader = self._make_loader(data_params.ForecastParams)
+
         model = self.prepare_model(loader)
         model.to(DEVICE)
 
@@ -334,14 +579,53 @@ class Model:
         stds = pd.Series(stds, index=list(self._tickers))
         stds = stds.mul((YEAR_IN_TRADING_DAYS / data_params.FORECAST_DAYS) ** 0.5)
 
-        return Forecast(
-            tickers=self._tickers,
-            date=self._end,
-            history_days=self._phenotype["data"]["history_days"],
-            mean=means,
-            std=stds,
-            risk_tolerance=self._phenotype["utility"]["risk_tolerance"],
-        )
+        return means, stds
+
+
+def _to_half(tensor: torch.Tensor) -> torch.Tensor:
+    """Сокращает точность хранения вещественных весов — при загрузке они приводятся к типу параметров модели."""
+    if tensor.is_floating_point():
+        return tensor.half()
+
+    return tensor
+
+
+def _remap_embedding(
+    weight: torch.Tensor,
+    init_weight: torch.Tensor,
+    tickers: tuple[str, ...],
+    new_tickers: tuple[str, ...],
+) -> torch.Tensor:
+    """Переставляет строки эмбендинга тикеров под новый состав, сохраняя начальные значения для новых тикеров."""
+    remapped = init_weight.clone()
+    for n, ticker in enumerate(new_tickers):
+        if ticker in tickers:
+            remapped[n] = weight[tickers.index(ticker)]
+
+    return remapped
+
+
+def _make_autocast(precision: str) -> torch.autocast:
+    """Контекст автоматического понижения точности при обучении.
+
+    Вычисления в bfloat16 включаются только при их аппаратной поддержке — на CPU необходимы инструкции AVX512 или
+    AMX, в противном случае обучение проходит в float32.
+    """
+    device_type = torch.device(DEVICE).type
+    enabled = precision == "bfloat16"
+
+    if enabled and not _bf16_supported(device_type):
+        LOGGER.warning(f"bfloat16 не поддерживается на {DEVICE} - обучение в float32")
+        enabled = False
+
+    return torch.autocast(device_type=device_type, dtype=torch.bfloat16, enabled=enabled)
+
+
+def _bf16_supported(device_type: str) -> bool:
+    if device_type == "cuda":
+        return torch.cuda.is_bf16_supported()
+
+    return torch.backends.cpu.get_cpu_capability() in {"AVX512", "AMX"}
 
 
 def _opt_port(
@@ -6,7 +6,7 @@ import torch
 from torch import distributions
 
 from poptimizer.dl import data_loader
-from poptimizer.dl.features import data_params
+from poptimizer.dl.features import FeatureType, data_params
 from poptimizer.dl.models import wave_net
 
 DATA_PARAMS = {
@@ -72,8 +72,7 @@ def make_data_loader():
 def test_wave_net_bn(loader):
     batch = next(iter(loader))
     batch2 = copy.deepcopy(batch)
-    batch2["Prices"] = batch2["Prices"][50:, :]
-    batch2["Dividends"] = batch2["Dividends"][50:, :]
+    batch2[data_loader.SEQUENCE] = batch2[data_loader.SEQUENCE][50:]
     batch2["DayOfYear"] = batch2["DayOfYear"][50:, :]
     batch2["Ticker"] = batch2["Ticker"][50:]
 
@@ -99,8 +98,7 @@ def test_wave_net_bn(loader):
 def test_wave_net_no_bn(loader):
     batch = next(iter(loader))
     batch2 = copy.deepcopy(batch)
-    batch2["Prices"] = batch2["Prices"][:40, :]
-    batch2["Dividends"] = batch2["Dividends"][:40, :]
+    batch2[data_loader.SEQUENCE] = batch2[data_loader.SEQUENCE][:40]
     batch2["DayOfYear"] = batch2["DayOfYear"][:40, :]
     batch2["Ticker"] = batch2["Ticker"][:40]
 
@@ -143,8 +141,7 @@ def make_data_loader_no_emb():
 def test_wave_net_no_embedding(loader_no_emb):
     batch = next(iter(loader_no_emb))
     batch2 = copy.deepcopy(batch)
-    batch2["Prices"] = batch2["Prices"][60:, :]
-    batch2["Dividends"] = batch2["Dividends"][60:, :]
+    batch2[data_loader.SEQUENCE] = batch2[data_loader.SEQUENCE][60:]
 
     net = wave_net.WaveNet(loader_no_emb.history_days, loader_no_emb.features_description, **NET_PARAMS)
     net.eval()
@@ -177,3 +174,91 @@ def test_dist(loader):
 
     llh = dist.log_prob(batch["Label"] + torch.tensor(1.0))
     assert llh.shape == (100, 1)
+
+
+FAKE_DESCRIPTION = {
+    "Label": (FeatureType.LABEL, 21),
+    "Sequence": (FeatureType.SEQUENCE, 2),
+    "DayOfYear": (FeatureType.EMBEDDING_SEQUENCE, 366),
+    "Ticker": (FeatureType.EMBEDDING, 4),
+}
+
+
+def make_fake_batch(size: int) -> dict[str, torch.Tensor]:
+    return {
+        "Label": torch.rand(size, 1),
+        "Sequence": torch.rand(size, 2, 17),
+        "DayOfYear": torch.randint(366, (size, 17)),
+        "Ticker": torch.randint(4, (size,)),
+    }
+
+
+def test_input_spec():
+    net = wave_net.WaveNet(17, FAKE_DESCRIPTION, **NET_PARAMS)
+
+    assert net.input_spec == ("Sequence", "DayOfYear", "Ticker")
+
+
+def test_compile_inference():
+    net = wave_net.WaveNet(17, FAKE_DESCRIPTION, **NET_PARAMS)
+    net.eval()
+    batch = make_fake_batch(10)
+
+    with torch.no_grad():
+        eager = net(batch)
+        net.compile_inference(make_fake_batch(7))
+        compiled = net(batch)
+
+    for eager_out, compiled_out in zip(eager, compiled):
+        assert compiled_out.shape == eager_out.shape
+        assert compiled_out.allclose(eager_out, atol=1e-6)
+
+    assert not any("_traced" in key for key in net.state_dict())
+
+    net.train()
+    assert vars(net)["_traced"] is None
+
+
+def split_state(state_dict):
+    split = {}
+    for key, tensor in state_dict.items():
+        if "signal_gate_conv" in key:
+            signal, gate = tensor.chunk(2)
+            split[key.replace("signal_gate_conv", "signal_conv")] = signal
+            split[key.replace("signal_gate_conv", "gate_conv")] = gate
+        elif key.startswith("output_conv."):
+            for head, part in zip(("logits", "m", "s"), tensor.chunk(3)):
+                split[key.replace("output_conv", f"output_conv_{head}")] = part
+        else:
+            split[key] = tensor
+
+    return split
+
+
+@pytest.mark.parametrize("keys", [("Sequence", "DayOfYear", "Ticker"), ("DayOfYear", "Ticker")])
+def test_load_unfused_state(keys):
+    description = {key: FAKE_DESCRIPTION[key] for key in keys}
+    net = wave_net.WaveNet(17, description, **NET_PARAMS)
+    net.eval()
+    batch = make_fake_batch(10)
+    state_dict = split_state(net.state_dict())
+    if "Sequence" not in keys:
+        # Ранее пустая BN создавалась и при отсутствии численных последовательностей
+        state_dict |= {f"bn.{key}": tensor for key, tensor in torch.nn.BatchNorm1d(0).state_dict().items()}
+
+    loaded = wave_net.WaveNet(17, description, **NET_PARAMS)
+    loaded.load_state_dict(state_dict)
+    loaded.eval()
+
+    assert "blocks.0.sub_blocks.0.gate_conv.bias" in state_dict
+    with torch.no_grad():
+        for net_out, loaded_out in zip(net(batch), loaded(batch)):
+            assert loaded_out.equal(net_out)
+
+
+def test_no_sequence_no_bn():
+    description = {key: FAKE_DESCRIPTION[key] for key in ("DayOfYear", "Ticker")}
+    net = wave_net.WaveNet(17, description, **NET_PARAMS)
+
+    assert not hasattr(net, "bn")
+    assert net(make_fake_batch(5))[0].shape == (5, 1, NET_PARAMS["mixture_size"])
@@ -5,7 +5,7 @@ import numpy as np
 import torch
 from torch import distributions, nn
 
-from poptimizer.config import DEVICE, POptimizerError
+from poptimizer.config import POptimizerError
 from poptimizer.dl.features import FeatureType
 
 EPS = torch.tensor(torch.finfo().eps)
@@ -23,7 +23,10 @@ class GradientsError(ModelError):
 
 
 class SubBlock(nn.Module):
-    """Блок с гейтом и остаточным соединением."""
+    """Блок с гейтом и остаточным соединением.
+
+    Signal и gate свертки объединены в одну свертку с удвоенным количеством выходных каналов.
+    """
 
     def __init__(self, kernels: int, gate_channels: int, residual_channels: int) -> None:
         """
@@ -36,15 +39,9 @@ class SubBlock(nn.Module):
         """
         super().__init__()
         self.signal_gate_pad = nn.ConstantPad1d(padding=(kernels - 1, 0), value=0.0)
-        self.signal_conv = nn.Conv1d(
+        self.signal_gate_conv = nn.Conv1d(
             in_channels=residual_channels,
-            out_channels=gate_channels,
-            kernel_size=kernels,
-            stride=1,
-        )
-        self.gate_conv = nn.Conv1d(
-            in_channels=residual_channels,
-            out_channels=gate_channels,
+            out_channels=2 * gate_channels,
             kernel_size=kernels,
             stride=1,
         )
@@ -58,11 +55,9 @@ class SubBlock(nn.Module):
              |-gate--sigma-|
         """
         y = self.signal_gate_pad(x)
+        y_signal, y_gate = self.signal_gate_conv(y).chunk(2, dim=1)
 
-        y_signal = self.signal_conv(y)
         y_signal = torch.relu(y_signal)
-
-        y_gate = self.gate_conv(y)
         y_gate = torch.sigmoid(y_gate)
 
         y = y_signal * y_gate
@@ -70,6 +65,11 @@ class SubBlock(nn.Module):
 
         return y + x
 
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        """Объединяет веса раздельных signal и gate сверток ранее сохраненных моделей."""
+        _fuse_state(state_dict, prefix, ("signal_conv", "gate_conv"), "signal_gate_conv")
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
 
 class Block(nn.Module):
     """Блок, состоящий из нескольких маленьких блоков и последующим уменьшением размерности.
@@ -145,9 +145,8 @@ class WaveNet(nn.Module):
 
     Использует два вида входных данных:
 
-    - Временные последовательности данных о бумагах, которые объединяются в виде отдельных, проходят
-    опционально
-    отключаемую BN
+    - Временные последовательности данных о бумагах, которые подаются в виде тензора (батч, каналы, время) и проходят
+    опционально отключаемую BN
     - Качественные характеристики бумаг, которые проходят эмбеддинг с одинаковым выходным количеством
     каналов, суммируются и добавляются к каналам временных последовательностей.
 
@@ -172,7 +171,7 @@ class WaveNet(nn.Module):
         :param history_days:
             Количество дней в истории.
         :param features_description:
-            Описание признаков.
+            Описание признаков. Для численных последовательностей размер признака — количество каналов.
         :param start_bn:
             Нужно ли производить BN для входящих численных значений.
         :param sub_blocks:
@@ -195,25 +194,23 @@ class WaveNet(nn.Module):
         super().__init__()
 
         self._features_description = features_description
+        self._sequence_keys = _keys_of_type(features_description, FeatureType.SEQUENCE)
+        self._embedding_seq_keys = _keys_of_type(features_description, FeatureType.EMBEDDING_SEQUENCE)
+        self._embedding_keys = _keys_of_type(features_description, FeatureType.EMBEDDING)
+        vars(self)["_traced"] = None  # noqa: WPS421
 
-        sequence_count = 0
+        sequence_count = sum(features_description[key][1] for key in self._sequence_keys)
         self.embedding_dict = nn.ModuleDict()
         self.embedding_seq_dict = nn.ModuleDict()
 
         for key, (feature_type, size) in features_description.items():
-            if feature_type is FeatureType.SEQUENCE:
-                sequence_count += 1
             if feature_type is FeatureType.EMBEDDING_SEQUENCE:
                 self.embedding_seq_dict[key] = nn.Embedding(num_embeddings=size, embedding_dim=residual_channels)
             if feature_type is FeatureType.EMBEDDING:
                 self.embedding_dict[key] = nn.Embedding(num_embeddings=size, embedding_dim=residual_channels)
 
-        if start_bn:
-            self.bn = nn.BatchNorm1d(sequence_count)
-        else:
-            self.bn = nn.Identity()
-
         if sequence_count:
+            self.bn = nn.BatchNorm1d(sequence_count) if start_bn else nn.Identity()
             self.start_conv = nn.Conv1d(
                 in_channels=sequence_count,
                 out_channels=residual_channels,
@@ -237,26 +234,59 @@ class WaveNet(nn.Module):
 
         self.end_conv = nn.Conv1d(in_channels=skip_channels, out_channels=end_channels, kernel_size=1)
 
-        self.output_conv_logits = nn.Conv1d(
+        self.output_conv = nn.Conv1d(
             in_channels=end_channels,
-            out_channels=mixture_size,
-            kernel_size=1,
-        )
-        self.output_conv_m = nn.Conv1d(
-            in_channels=end_channels,
-            out_channels=mixture_size,
-            kernel_size=1,
-        )
-        self.output_conv_s = nn.Conv1d(
-            in_channels=end_channels,
-            out_channels=mixture_size,
+            out_channels=3 * mixture_size,
             kernel_size=1,
         )
         self.output_softplus_s = nn.Softplus()
 
+    @property
+    def input_spec(self) -> tuple[str, ...]:
+        """Упорядоченный перечень признаков, подаваемых на вход сети.
+
+        Сначала идут численные последовательности в порядке их каналов, затем последовательности для эмбеддинга и
+        эмбеддинги. Порядок фиксирован при создании модели, что позволяет передавать признаки позиционно.
+        """
+        return self._sequence_keys + self._embedding_seq_keys + self._embedding_keys
+
+    def train(self, mode: bool = True) -> "WaveNet":
+        """При переходе в режим обучения скомпилированная версия сети становится неактуальной."""
+        if mode:
+            vars(self)["_traced"] = None  # noqa: WPS421
+
+        return super().train(mode)
+
+    def compile_inference(self, batch: dict[str, torch.Tensor]) -> None:
+        """Компилирует сеть для ускоренного прогнозирования с помощью TorchScript.
+
+        Сеть переводится в режим оценки, трассируется на примере батча и замораживается — веса становятся
+        константами, а цикл по блокам и обход словаря признаков выполняются один раз при трассировке. Скомпилированная
+        версия не регистрируется в качестве подмодуля, чтобы не попадать в state_dict.
+        """
+        self.eval()
+        inputs = tuple(batch[key] for key in self.input_spec)
+
+        with torch.no_grad():
+            traced = torch.jit.trace(_PositionalWaveNet(self).eval(), inputs, check_trace=False)
+
+        vars(self)["_traced"] = torch.jit.freeze(traced)  # noqa: WPS421
+
     def forward(
         self, batch: dict[str, Union[torch.Tensor, list[torch.Tensor]]]
     ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Прогноз по словарю с признаками.
+
+        В режиме оценки при наличии скомпилированной версии сети используется она.
+        """
+        inputs = tuple(batch[key] for key in self.input_spec)
+
+        if (traced := vars(self).get("_traced")) is not None and not self.training:  # noqa: WPS421
+            return traced(*inputs)
+
+        return self.forward_inputs(*inputs)
+
+    def forward_inputs(self, *inputs: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         """
         ->sequence-+
         ->........-+
@@ -265,48 +295,44 @@ class WaveNet(nn.Module):
         ->embedding-------------------+ |-skips-+-...-skips-+-skips------+-relu-end-relu-|-output_m->
         ->........------+                                                     |--------|
         ->embedding-----+                                                     |-output_s-softplus->
-        """
-        y = torch.zeros(1, 1, 1, dtype=torch.float, device=DEVICE)
 
-        y_seq = []
+        Признаки передаются позиционно в порядке input_spec, численные последовательности — в виде тензоров
+        (батч, каналы, время).
+        """
+        n_seq = len(self._sequence_keys)
+        n_emb_seq = len(self._embedding_seq_keys)
 
-        for key, (feature_type, _) in self._features_description.items():
-            if feature_type is FeatureType.SEQUENCE:
-                y_seq.append(batch[key])
+        y = None
 
-        if y_seq:
-            y = torch.stack(y_seq, dim=1)
+        if n_seq:
+            y = inputs[0] if n_seq == 1 else torch.cat(inputs[:n_seq], dim=1)
             y = self.bn(y)
             y = self.start_conv(y)
 
-        for key, (feature_type, _) in self._features_description.items():
-            if feature_type is FeatureType.EMBEDDING_SEQUENCE:
-                emb_seq = self.embedding_seq_dict[key](batch[key])
-                emb_seq = emb_seq.permute((0, 2, 1))
-                y = emb_seq + y
-            if feature_type is FeatureType.EMBEDDING:
-                emb = self.embedding_dict[key](batch[key])
-                emb = emb.unsqueeze(2)
-                y = emb + y
+        for key, emb_input in zip(self._embedding_seq_keys, inputs[n_seq : n_seq + n_emb_seq]):
+            emb_seq = self.embedding_seq_dict[key](emb_input)
+            emb_seq = emb_seq.permute((0, 2, 1))
+            y = emb_seq if y is None else emb_seq + y
 
-        skips = torch.tensor(0, dtype=torch.float)
+        for key, emb_input in zip(self._embedding_keys, inputs[n_seq + n_emb_seq :]):
+            emb = self.embedding_dict[key](emb_input)
+            emb = emb.unsqueeze(2)
+            y = emb if y is None else emb + y
+
+        skips = None
 
         for block in self.blocks:
             y, skip = block(y)
-            skips = skips + skip
+            skips = skip if skips is None else skips + skip
 
         skip = self.final_skip_conv(y)
-        skips = skip + skips
+        skips = skip if skips is None else skip + skips
 
         y = torch.relu(skips)
         y = self.end_conv(y)
         y = torch.relu(y)
 
-        logits = self.output_conv_logits(y)
-
-        mean = self.output_conv_m(y)
-
-        std = self.output_conv_s(y)
+        logits, mean, std = self.output_conv(y).chunk(3, dim=1)
         std = self.output_softplus_s(std) + EPS
 
         return (
@@ -321,8 +347,11 @@ class WaveNet(nn.Module):
         self,
         batch: dict[str, Union[torch.Tensor, list[torch.Tensor]]],
     ) -> distributions.Distribution:
-        """Возвращает распределение доходности."""
-        logits, mean, std = self(batch)
+        """Возвращает распределение доходности.
+
+        Параметры распределения всегда рассчитываются в float32, в том числе при обучении с пониженной точностью.
+        """
+        logits, mean, std = (output.float() for output in self(batch))
 
         try:
             weights_dist = distributions.Categorical(logits=logits)
@@ -332,3 +361,45 @@ class WaveNet(nn.Module):
         comp_dist = distributions.LogNormal(mean, std)
 
         return distributions.MixtureSameFamily(weights_dist, comp_dist)
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        """Приводит веса ранее сохраненных моделей к текущей структуре сети.
+
+        Объединяются веса раздельных выходных сверток и удаляются веса пустой BN, которая создавалась при отсутствии
+        численных последовательностей.
+        """
+        heads = ("output_conv_logits", "output_conv_m", "output_conv_s")
+        _fuse_state(state_dict, prefix, heads, "output_conv")
+
+        if not hasattr(self, "bn"):
+            for key in [key for key in state_dict if key.startswith(f"{prefix}bn.")]:
+                state_dict.pop(key)
+
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+
+class _PositionalWaveNet(nn.Module):
+    """Обертка для трассировки сети с позиционной передачей признаков."""
+
+    def __init__(self, net: WaveNet) -> None:
+        super().__init__()
+        self.net = net
+
+    def forward(self, *inputs: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Прогноз по признакам в порядке input_spec."""
+        return self.net.forward_inputs(*inputs)
+
+
+def _fuse_state(state_dict: dict[str, torch.Tensor], prefix: str, convs: tuple[str, ...], fused: str) -> None:
+    """Заменяет в state_dict параметры нескольких сверток параметрами одной свертки с объединенными выходами."""
+    for param in ("weight", "bias"):
+        keys = [f"{prefix}{conv}.{param}" for conv in convs]
+        if all(key in state_dict for key in keys):
+            state_dict[f"{prefix}{fused}.{param}"] = torch.cat([state_dict.pop(key) for key in keys])
+
+
+def _keys_of_type(
+    features_description: dict[str, tuple[FeatureType, int]],
+    feature_type: FeatureType,
+) -> tuple[str, ...]:
+    return tuple(key for key, (key_type, _) in features_description.items() if key_type is feature_type)
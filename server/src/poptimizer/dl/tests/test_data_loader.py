@@ -26,12 +26,19 @@ class TestOneTickerDataset:
         dataset, _ = dataset_params
         example = dataset[22]
         assert isinstance(example, dict)
-        assert len(example) == 3
-        keys = {"Label", "Prices", "Dividends"}
+        assert len(example) == 2
+        keys = {"Label", data_loader.SEQUENCE}
         assert set(example) == keys
         for key in keys:
             assert isinstance(example[key], torch.Tensor)
 
+        sequence = example[data_loader.SEQUENCE]
+        assert sequence.shape == (2, 245)
+        for row, feature in zip(sequence, dataset.sequences):
+            assert torch.equal(row, feature[22])
+
+        assert torch.equal(dataset.labels[22], example["Label"])
+
     def test_len(self, dataset_params):
         dataset, params = dataset_params
         assert len(dataset) == params.len("NMTP")
@@ -40,12 +47,11 @@ class TestOneTickerDataset:
         dataset, _ = dataset_params
         description = dataset.features_description
         assert isinstance(description, dict)
-        assert len(description) == 3
-        assert description == dict(
-            Label=(FeatureType.LABEL, FORECAST_DAYS),
-            Prices=(FeatureType.SEQUENCE, 245),
-            Dividends=(FeatureType.SEQUENCE, 245),
-        )
+        assert len(description) == 2
+        assert description == {
+            "Label": (FeatureType.LABEL, FORECAST_DAYS),
+            data_loader.SEQUENCE: (FeatureType.SEQUENCE, 2),
+        }
 
 
 @pytest.fixture(scope="class", name="loader")
@@ -59,16 +65,97 @@ class TestDescribedDataLoader:
 
         example = next(iter(loader))
         assert isinstance(example, dict)
-        assert len(example) == 2
-        keys = {"Prices", "Dividends"}
-        assert set(example) == keys
-        for key in keys:
-            assert isinstance(example[key], torch.Tensor)
+        assert len(example) == 1
+        assert set(example) == {data_loader.SEQUENCE}
+        assert example[data_loader.SEQUENCE].shape == (2, 2, 245)
+        assert loader.labels is None
 
     def test_features_description(self, loader):
         description = loader.features_description
         assert isinstance(description, dict)
-        assert len(description) == 2
-        assert description == dict(
-            Prices=(FeatureType.SEQUENCE, 245), Dividends=(FeatureType.SEQUENCE, 245)
+        assert len(description) == 1
+        assert description == {data_loader.SEQUENCE: (FeatureType.SEQUENCE, 2)}
+
+
+class FakeParams(data_params.DataParams):
+    def _div_price(self, tickers, end):
+        index = pd.bdate_range("2020-01-01", periods=60)
+        price = pd.DataFrame(
+            {"AAA": range(1, 61), "BBB": [None] * 10 + list(range(50, 100))},
+            index=index,
+            dtype=float,
         )
+        div = price.notna() * 0.1
+
+        return div, price
+
+
+FAKE_PARAMS = {
+    "batch_size": 5,
+    "history_days": 8,
+    "precision": "float32",
+    "features": {
+        "Label": {"on": True},
+        "Prices": {"on": True},
+        "Dividends": {"on": True},
+        "Ticker": {"on": True},
+        "DayOfYear": {"on": True},
+        "DayOfPeriod": {"on": True},
+    },
+}
+
+
+def test_tickers_dataset_batch_matches_examples(monkeypatch):
+    monkeypatch.setattr(data_params, "FORECAST_DAYS", 21)
+    params = FakeParams(("AAA", "BBB"), DATE, FAKE_PARAMS)
+    data_sets = [data_loader.OneTickerDataset(ticker, params) for ticker in ("AAA", "BBB")]
+    dataset = data_loader.TickersDataset(data_sets)
+    examples = [data_set[item] for data_set in data_sets for item in range(len(data_set))]
+
+    assert len(dataset) == len(examples)
+    assert dataset.features_description == data_sets[0].features_description
+    assert torch.equal(dataset.labels, torch.cat([data_set.labels for data_set in data_sets]))
+
+    indexes = [len(examples) - 1, 0, 40, 3, 31]
+    batch = dataset[indexes]
+    for key, value in batch.items():
+        expected = torch.stack([examples[index][key] for index in indexes])
+        assert value.shape == expected.shape
+        assert value.allclose(expected)
+
+    single = dataset[40]
+    for key, value in single.items():
+        assert value.allclose(examples[40][key])
+
+
+def test_data_loader_workers(monkeypatch):
+    monkeypatch.setattr(data_params, "FORECAST_DAYS", 21)
+    loader = data_loader.DescribedDataLoader(("AAA", "BBB"), DATE, FAKE_PARAMS, FakeParams)
+    workers_loader = data_loader.DescribedDataLoader(("AAA", "BBB"), DATE, FAKE_PARAMS, FakeParams, num_workers=1)
+
+    assert len(workers_loader) == len(loader) == 11
+    for _ in range(2):
+        for batch, workers_batch in zip(loader, workers_loader, strict=True):
+            assert batch.keys() == workers_batch.keys()
+            for key, value in batch.items():
+                assert torch.equal(value, workers_batch[key])
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_index_batch_sampler(shuffle):
+    sampler = data_loader.IndexBatchSampler(23, 5, shuffle)
+    batches = list(sampler)
+
+    assert len(sampler) == len(batches) == 5
+    assert [len(batch) for batch in batches] == [5, 5, 5, 5, 3]
+    indexes = torch.cat(batches)
+    assert sorted(indexes.tolist()) == list(range(23))
+    assert torch.equal(indexes, torch.arange(23)) is not shuffle
+
+
+def test_index_batch_sampler_skip():
+    sampler = data_loader.IndexBatchSampler(23, 5, False)
+    sampler.skip(3)
+
+    assert [batch.tolist() for batch in sampler] == [[15, 16, 17, 18, 19], [20, 21, 22]]
+    assert len(list(sampler)) == 5
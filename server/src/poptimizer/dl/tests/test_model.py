@@ -2,8 +2,11 @@ import copy
 
 import pandas as pd
 import pytest
+import torch
 
 from poptimizer.dl import model
+from poptimizer.dl.features import FeatureType, data_params
+from poptimizer.dl.models import wave_net
 from poptimizer.dl.forecast import Forecast
 from poptimizer.evolve import population, store
 
@@ -60,3 +63,147 @@ def test_forecast(org):
     assert forecast.mean.index.tolist() == list(org._doc.tickers)
     assert isinstance(forecast.std, pd.Series)
     assert forecast.std.index.tolist() == list(org._doc.tickers)
+
+
+def test_train_resumes_from_checkpoint(org, tmp_path):
+    gen = copy.deepcopy(org.genotype)
+    gen["Scheduler"]["epochs"] /= 10
+    phenotype = gen.get_phenotype()
+    tickers = tuple(org._doc.tickers)
+    checkpoint = tmp_path / "org.pt"
+
+    interrupted = model.Model(tickers, org._doc.date, phenotype, checkpoint=checkpoint, deadline=0)
+    with pytest.raises(model.DeadlineError):
+        interrupted.quality_metrics
+
+    stats = torch.load(checkpoint)["stats"]
+    assert stats["step"] == 1
+    assert type(stats["llh_min"]) is float
+    assert len(stats["llh_deque"]) == 2
+
+    resumed = model.Model(tickers, org._doc.date, phenotype, checkpoint=checkpoint)
+    resumed.quality_metrics
+
+    assert resumed.restored_ns == stats["elapsed_ns"]
+    assert not checkpoint.exists()
+
+
+def test_llh_parity_bf16():
+    """Правдоподобие при хранении признаков в float16 и обучении в bfloat16 близко к float32."""
+    torch.manual_seed(0)
+    description = {
+        "Label": (FeatureType.LABEL, 21),
+        "Sequence": (FeatureType.SEQUENCE, 1),
+        "Ticker": (FeatureType.EMBEDDING, 3),
+    }
+    net_params = {
+        "start_bn": False,
+        "kernels": 3,
+        "sub_blocks": 1,
+        "gate_channels": 8,
+        "residual_channels": 8,
+        "skip_channels": 8,
+        "end_channels": 8,
+        "mixture_size": 2,
+    }
+    net = wave_net.WaveNet(17, description, **net_params)
+    batch = {
+        "Label": torch.rand(64, 1) / 10,
+        "Sequence": torch.rand(64, 1, 17) / 10,
+        "Ticker": torch.randint(3, (64,)),
+    }
+    batch_half = batch | {"Sequence": batch["Sequence"].to(data_params.FEATURE_DTYPES["bfloat16"]).float()}
+
+    llh, _, _ = model.log_normal_llh_mix(net, batch)
+    with torch.autocast(device_type="cpu", dtype=torch.bfloat16):
+        llh_half, _, _ = model.log_normal_llh_mix(net, batch_half)
+
+    assert llh_half.dtype == torch.float
+    assert llh_half.item() == pytest.approx(llh.item(), rel=0.05)
+
+
+def test_screening():
+    net = model.Model(("KRKNP",), pd.Timestamp("2020-05-23"), {}, screening_llh=0.5)
+
+    net._screen(0.7)
+    assert net.proxy_llh == 0.7
+
+    with pytest.raises(model.ScreeningError):
+        net._screen(0.3)
+    assert net.proxy_llh == 0.3
+
+    unscreened = model.Model(("KRKNP",), pd.Timestamp("2020-05-23"), {})
+    unscreened._screen(-10.0)
+    assert unscreened.proxy_llh == -10.0
+
+
+def test_warm_start_remaps_tickers():
+    torch.manual_seed(0)
+    net_params = {
+        "start_bn": False,
+        "kernels": 3,
+        "sub_blocks": 1,
+        "gate_channels": 4,
+        "residual_channels": 4,
+        "skip_channels": 4,
+        "end_channels": 4,
+        "mixture_size": 2,
+    }
+    old_net = wave_net.WaveNet(
+        5,
+        {"Label": (FeatureType.LABEL, 21), "Ticker": (FeatureType.EMBEDDING, 3)},
+        **net_params,
+    )
+    new_net = wave_net.WaveNet(
+        5,
+        {"Label": (FeatureType.LABEL, 21), "Ticker": (FeatureType.EMBEDDING, 2)},
+        **net_params,
+    )
+    init_weight = new_net.embedding_dict["Ticker"].weight.detach().clone()
+
+    warm_model = model.Model(("A", "B", "C"), pd.Timestamp("2020-05-23"), {})
+    warm_model._model = old_net
+    pickled_model = bytes(warm_model)
+
+    net = model.Model(("C", "D"), pd.Timestamp("2020-05-25"), {}, warm_start=(pickled_model, ("A", "B", "C")))
+
+    assert net._load_warm_start(new_net)
+
+    weight = new_net.embedding_dict["Ticker"].weight
+    old_weight = old_net.embedding_dict["Ticker"].weight
+    assert torch.equal(weight[0], old_weight[2])
+    assert torch.equal(weight[1], init_weight[1])
+    assert torch.equal(new_net.end_conv.weight, old_net.end_conv.weight)
+
+
+def _make_training():
+    net = torch.nn.Linear(2, 1)
+    optimizer = torch.optim.AdamW(net.parameters())
+    scheduler = torch.optim.lr_scheduler.OneCycleLR(optimizer, max_lr=0.01, total_steps=10)
+
+    return {"model": net, "optimizer": optimizer, "scheduler": scheduler}
+
+
+def test_checkpoint_save_and_restore(tmp_path):
+    torch.manual_seed(0)
+    checkpoint = tmp_path / "org.pt"
+    end = pd.Timestamp("2020-05-23")
+    training = _make_training()
+    training["model"](torch.ones(2)).sum().backward()
+    training["optimizer"].step()
+    training["scheduler"].step()
+    stats = {"step": 1, "llh_sum": 0.5}
+
+    net = model.Model(("KRKNP",), end, {}, checkpoint=checkpoint)
+    net._save_checkpoint(training, 10, stats)
+    assert checkpoint.exists()
+
+    restored = _make_training()
+    assert net._restore_checkpoint(restored, 10) == stats
+    assert torch.equal(restored["model"].weight, training["model"].weight)
+    assert restored["optimizer"].state_dict()["state"].keys() == training["optimizer"].state_dict()["state"].keys()
+    assert restored["scheduler"].last_epoch == 1
+
+    assert net._restore_checkpoint(_make_training(), 20) is None
+    other_date = model.Model(("KRKNP",), pd.Timestamp("2020-05-25"), {}, checkpoint=checkpoint)
+    assert other_date._restore_checkpoint(_make_training(), 10) is None
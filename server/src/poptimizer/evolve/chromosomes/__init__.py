@@ -1,5 +1,5 @@
 """Хромосомы и гены для мутации параметров модели, данных и политики обучения."""
-from poptimizer.evolve.chromosomes.chromosome import Chromosome, ChromosomeData
+from poptimizer.evolve.chromosomes.chromosome import Chromosome, ChromosomeData, mutate
 from poptimizer.evolve.chromosomes.data import Data
 from poptimizer.evolve.chromosomes.model import Model
 from poptimizer.evolve.chromosomes.optimizer import Optimizer
@@ -4,8 +4,8 @@ from collections import UserDict
 from dataclasses import dataclass
 from typing import Any, Callable, ClassVar, Optional
 
+import numpy as np
 from numpy import random
-from scipy import stats
 
 from poptimizer.dl import PhenotypeData
 
@@ -75,6 +75,33 @@ class Chromosome(UserDict):
             value_key = gene.path[-1]
             node[value_key] = gene.phenotype_function(self[gene.name])
 
+    @classmethod
+    def gene_names(cls) -> tuple[str, ...]:
+        """Названия генов в фиксированном порядке их размещения в векторе."""
+        return tuple(gene.name for gene in cls._genes)
+
+    @classmethod
+    def bounds(cls) -> tuple[np.ndarray, np.ndarray]:
+        """Нижние и верхние границы генов в порядке их размещения в векторе — бесконечные при отсутствии."""
+        lower = [-np.inf if gene.lower_bound is None else gene.lower_bound for gene in cls._genes]
+        upper = [np.inf if gene.upper_bound is None else gene.upper_bound for gene in cls._genes]
+
+        return np.array(lower, dtype=float), np.array(upper, dtype=float)
+
+    def to_vector(self) -> np.ndarray:
+        """Значения генов в виде вектора в фиксированном порядке."""
+        return np.array([self[name] for name in self.gene_names()], dtype=float)
+
+    def from_vector(self, vector: np.ndarray) -> "Chromosome":
+        """Копия хромосомы со значениями генов из вектора.
+
+        Значения, отсутствующие в описании генов, сохраняются без изменений.
+        """
+        chromosome = copy.copy(self)
+        chromosome.update(zip(self.gene_names(), vector.tolist()))
+
+        return chromosome
+
     def make_child(
         self,
         parent1: "Chromosome",
@@ -101,14 +128,9 @@ class Chromosome(UserDict):
         :return:
             Представление хромосомы потомка в виде словаря.
         """
-        child = copy.deepcopy(self)
-        for gene in self._genes:
-            key = gene.name
-            diff = (parent1[key] - parent2[key]) * scale
-            raw_value = child[key] + diff * stats.cauchy.rvs()
-            child[key] = _to_bounds(raw_value, gene.lower_bound, gene.upper_bound)
+        vector = mutate(self.to_vector(), parent1.to_vector(), parent2.to_vector(), scale, *self.bounds())
 
-        return child
+        return self.from_vector(vector)
 
 
 def _default_chromosome_data(genes: tuple[GeneParams, ...]) -> ChromosomeData:
@@ -124,11 +146,47 @@ def _default_chromosome_data(genes: tuple[GeneParams, ...]) -> ChromosomeData:
     return chromosome_data
 
 
-def _to_bounds(raw_value: float, lower_bound: Optional[float], upper_bound: Optional[float]) -> float:
-    while True:
-        if lower_bound is not None and raw_value < lower_bound:
-            raw_value = lower_bound + (lower_bound - raw_value)
-        elif upper_bound is not None and raw_value > upper_bound:
-            raw_value = upper_bound - (raw_value - upper_bound)
-        else:
-            return raw_value
+def mutate(
+    vector: np.ndarray,
+    parent1: np.ndarray,
+    parent2: np.ndarray,
+    scale: float,
+    lower: np.ndarray,
+    upper: np.ndarray,
+) -> np.ndarray:
+    """Мутация вектора генов на основе алгоритма дифференциальной эволюции с отражением от границ.
+
+    Случайные величины из распределения Коши генерируются сразу для всех генов.
+    """
+    diff = (parent1 - parent2) * scale
+    raw_vector = vector + diff * random.standard_cauchy(vector.shape)
+
+    return _to_bounds(raw_vector, lower, upper)
+
+
+def _to_bounds(
+    raw_value: float | np.ndarray,
+    lower_bound: Optional[float] | np.ndarray,
+    upper_bound: Optional[float] | np.ndarray,
+) -> float | np.ndarray:
+    """Отражает значения от границ, пока они не окажутся в допустимом интервале.
+
+    Многократное отражение от двух границ эквивалентно свертке значения с периодом в две ширины интервала, поэтому
+    рассчитывается сразу для всех значений. Отсутствующие границы задаются None или бесконечными значениями.
+    """
+    lower = np.asarray(-np.inf if lower_bound is None else lower_bound, dtype=float)
+    upper = np.asarray(np.inf if upper_bound is None else upper_bound, dtype=float)
+    raw_value = np.asarray(raw_value, dtype=float)
+
+    with np.errstate(invalid="ignore"):
+        reflected = np.where(raw_value < lower, 2 * lower - raw_value, raw_value)
+        reflected = np.where(reflected > upper, 2 * upper - reflected, reflected)
+
+        width = upper - lower
+        folded = lower + width - np.abs(np.mod(raw_value - lower, 2 * width) - width)
+
+    rez = np.where(np.isfinite(width), folded, reflected)
+    if rez.ndim:
+        return rez
+
+    return float(rez)
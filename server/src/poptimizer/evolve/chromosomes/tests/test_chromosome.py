@@ -1,4 +1,5 @@
 """Тесты для базового класса хромосомы."""
+import numpy as np
 import pytest
 
 from poptimizer.evolve.chromosomes import chromosome
@@ -18,3 +19,21 @@ BOUND_CASES = (
 def test_to_bounds(raw, lower, upper, rez):
     """Тестирование корректности отражения от границ."""
     assert chromosome._to_bounds(raw, lower, upper) == pytest.approx(rez)
+
+
+def test_to_bounds_vector():
+    """Отражение от границ для вектора совпадает с поэлементным."""
+    raw, lower, upper, rez = zip(*BOUND_CASES)
+    lower = [-np.inf if bound is None else bound for bound in lower]
+    upper = [np.inf if bound is None else bound for bound in upper]
+
+    assert chromosome._to_bounds(np.array(raw), np.array(lower), np.array(upper)) == pytest.approx(rez)
+
+
+def test_mutate_zero_scale():
+    """При нулевом коэффициенте вектор не меняется."""
+    vector = np.array([1.0, -2.0, 3.0])
+    lower = np.array([0, -np.inf, -np.inf])
+    upper = np.array([np.inf, np.inf, 5])
+
+    assert chromosome.mutate(vector, vector + 1, vector, 0, lower, upper).tolist() == vector.tolist()
@@ -0,0 +1,86 @@
+"""Модель времени обучения организмов."""
+from typing import Final, Optional
+
+import numpy as np
+from scipy import stats
+
+from poptimizer.dl import PhenotypeData
+
+# Количество признаков модели времени обучения, включая константу
+N_FEATURES: Final = 6
+# Минимальное количество обученных организмов для оценки модели
+MIN_SAMPLES: Final = 2 * N_FEATURES
+
+
+def features(phenotype: PhenotypeData, n_tickers: int) -> np.ndarray:
+    """Логарифмы характеристик, определяющих время обучения.
+
+    Время обучения пропорционально количеству эпох, числу тикеров, длине истории и количеству операций на одну позицию
+    последовательности, которое оценивается количеством весов сверточных слоев WaveNet. Размер батча влияет на накладные
+    расходы на один шаг обучения.
+    """
+    data = phenotype["data"]
+    history_days = max(int(data["history_days"]), 2)
+
+    log_features = np.log(
+        [
+            phenotype["scheduler"]["epochs"],
+            n_tickers,
+            history_days,
+            data["batch_size"],
+            _wave_net_size(phenotype["model"], history_days),
+        ],
+    )
+
+    return np.concatenate([[1], log_features])
+
+
+def _wave_net_size(model: dict, history_days: int) -> float:
+    """Количество весов сверточных слоев WaveNet без учета эмбендингов."""
+    kernels = model["kernels"]
+    gate = model["gate_channels"]
+    residual = model["residual_channels"]
+    skip = model["skip_channels"]
+    end = model["end_channels"]
+
+    sub_block = 2 * kernels * residual * gate + gate * residual
+    block = model["sub_blocks"] * sub_block + residual * skip + 2 * residual**2
+    blocks = int(np.log2(history_days - 1)) + 1
+
+    return blocks * block + residual * skip + skip * end + 3 * end * model["mixture_size"]
+
+
+class CostModel:
+    """Линейная модель логарифма времени обучения от логарифмов характеристик фенотипа.
+
+    Обучается методом наименьших квадратов на сохраненных при обучении характеристиках и времени обучения организмов
+    популяции. Позволяет до начала обучения оценить, какую долю популяции организм превзойдет по медленности обучения.
+    """
+
+    def __init__(self, costs: list[list[float]], timers: list[float]) -> None:
+        """Оценивает коэффициенты модели при достаточном количестве обученных организмов.
+
+        :param costs:
+            Характеристики организмов, сохраненные при обучении.
+        :param timers:
+            Время обучения организмов.
+        """
+        self._timers = np.array(timers, dtype=float)
+        self._coef = None
+
+        if len(timers) >= MIN_SAMPLES:
+            self._coef, *_ = np.linalg.lstsq(np.array(costs), np.log(self._timers), rcond=None)
+
+    def predict(self, phenotype: PhenotypeData, n_tickers: int) -> Optional[float]:
+        """Прогноз времени обучения или None, если модель не оценена."""
+        if self._coef is None:
+            return None
+
+        return float(np.exp(features(phenotype, n_tickers) @ self._coef))
+
+    def slowness(self, phenotype: PhenotypeData, n_tickers: int) -> Optional[float]:
+        """Прогнозная доля организмов популяции, обучающихся быстрее, или None, если модель не оценена."""
+        if (timer := self.predict(phenotype, n_tickers)) is None:
+            return None
+
+        return stats.percentileofscore(self._timers, timer, kind="mean") / 100
@@ -2,7 +2,7 @@
 import datetime
 import itertools
 import logging
-import operator
+import time
 from typing import Optional
 
 import numpy as np
@@ -10,8 +10,8 @@ from scipy import stats
 
 from poptimizer import config
 from poptimizer.data.views import listing
-from poptimizer.dl import ModelError
-from poptimizer.evolve import population, seq
+from poptimizer.dl import DeadlineError, ModelError
+from poptimizer.evolve import cost, metrics, population, seq, store, surrogate
 from poptimizer.portfolio.portfolio import load_tickers
 
 
@@ -30,6 +30,7 @@ class Evolution:  # noqa: WPS214
         self._end = None
         self._logger = logging.getLogger()
         self._tests = 1
+        self._metrics = metrics.MetricsIndex()
 
     @property
     def _scale(self) -> float:
@@ -57,7 +58,9 @@ class Evolution:  # noqa: WPS214
                 f"Оценок - {population.min_scores()}-{population.max_scores()}\n"
             )
 
+            self._metrics.load(population.get_metrics())
             self._step(org)
+            store.flush()
 
             delta = population.count() - count
 
@@ -100,6 +103,7 @@ class Evolution:  # noqa: WPS214
                 self._logger.info(f"Создается базовый организм {i}:")
                 org = population.create_new_organism()
                 self._logger.info(f"{org}\n")
+            store.flush()
 
         self._tests = max(population.min_scores(), seq.minimum_bounding_n(config.P_VALUE / (population.count() + 1)))
 
@@ -120,23 +124,79 @@ class Evolution:  # noqa: WPS214
 
             return None
 
+        surrogate_model = self._make_surrogate()
+        cost_model = self._make_cost_model()
         for n_child in itertools.count(1):
             self._logger.info(f"Потомок {n_child}:")
 
-            hunter = hunter.make_child(1 / self._scale)
+            hunter = self._make_child(hunter, surrogate_model)
+
+            if not _fits_window(cost_model.predict(hunter.genotype.get_phenotype(), len(self._tickers))):
+                self._logger.info("Прогноз времени обучения превышает остаток времени работы - не обучается...\n")
+
+                return None
+
+            slowness = cost_model.slowness(hunter.genotype.get_phenotype(), len(self._tickers))
+            if slowness is not None and (rnd := np.random.random()) < slowness:
+                self._logger.info(f"Прогноз медленного обучения {rnd=:.2%} < {slowness=:.2%} - не обучается...\n")
+
+                return None
+
             if (margin := self._eval_organism(hunter)) is None:
                 return None
 
-            if (rnd := np.random.random()) < (slowness := margin[1]):
+            if slowness is None and (rnd := np.random.random()) < (slowness := margin[1]):
                 self._logger.info(f"Медленный не размножается {rnd=:.2%} < {slowness=:.2%}...\n")
 
                 return None
 
+    def _make_surrogate(self) -> surrogate.Surrogate:
+        """Суррогатная модель на основе генотипов и медианных метрик оцененных организмов."""
+        genotypes = []
+        scores = {metric: [] for metric in surrogate.METRICS}
+
+        for org in population.get_all(["genotype", *surrogate.METRICS]):
+            medians = {metric: np.median(getattr(org, metric) or [np.nan]) for metric in surrogate.METRICS}
+            if np.all(np.isfinite(list(medians.values()))):
+                genotypes.append(org.genotype)
+                for metric, median in medians.items():
+                    scores[metric].append(median)
+
+        return surrogate.Surrogate(genotypes, **scores)
+
+    def _make_cost_model(self) -> cost.CostModel:
+        """Модель времени обучения на основе характеристик и времени обучения организмов популяции."""
+        costs = []
+        timers = []
+
+        for org in population.get_all(["cost", "timer"]):
+            if org.cost is not None and len(org.cost) == cost.N_FEATURES and org.timer > 0:
+                costs.append(org.cost)
+                timers.append(org.timer)
+
+        return cost.CostModel(costs, timers)
+
+    def _make_child(
+        self,
+        hunter: population.Organism,
+        surrogate_model: surrogate.Surrogate,
+    ) -> population.Organism:
+        """Создает несколько потомков и выбирает наиболее перспективного с помощью суррогатной модели.
+
+        Родители всех потомков выбираются из одной случайной выборки организмов, полученной одним запросом.
+        """
+        n_children = max(1, config.SURROGATE_CANDIDATES)
+        parents_pool = population.get_parents_pool(2 * n_children)
+        scale = 1 / self._scale
+        children = [hunter.make_child(scale, parents_pool) for _ in range(n_children)]
+
+        return children[surrogate_model.best([child.genotype for child in children])]
+
     def _eval_organism(self, organism: population.Organism) -> tuple[float, float] | None:
         try:
             self._logger.info(f"{organism}\n")
         except AttributeError as err:
-            organism.die()
+            self._die(organism)
             self._logger.error(f"Удаляю - {err}\n")
 
             return None
@@ -145,34 +205,47 @@ class Evolution:  # noqa: WPS214
 
         try:
             if organism.date == self._end:
-                prob = 1 - _time_delta(organism)
+                prob = 1 - self._metrics.timer_percentile(organism.timer)
                 retry = stats.geom.rvs(prob)
                 dates = all_dates[-max(self.tests, (organism.scores + retry)): -organism.scores].tolist()
-                organism.retrain(self._tickers, dates[0])
+                organism.retrain(self._tickers, dates[0], deadline=_window_end())
                 dates = reversed(dates)
             elif organism.scores:
                 if self._tickers != tuple(organism.tickers):
-                    organism.retrain(self._tickers, self._end)
+                    organism.retrain(self._tickers, self._end, deadline=_window_end())
                 dates = [self._end]
             else:
                 dates = all_dates[-self.tests:].tolist()
-                organism.retrain(self._tickers, dates[0])
+                organism.retrain(self._tickers, dates[0], population.median_proxy(), _window_end())
+        except DeadlineError as error:
+            organism.save()
+            self._logger.info(f"{error} - обучение будет продолжено с контрольной точки\n")
+
+            return None
+        except (ModelError, AttributeError) as error:
+            self._die(organism)
+            self._logger.error(f"Удаляю - {error}\n")
+
+            return None
+
+        try:
+            organism.evaluate_fitness_dates(self._tickers, list(dates))
         except (ModelError, AttributeError) as error:
-            organism.die()
+            self._die(organism)
             self._logger.error(f"Удаляю - {error}\n")
 
             return None
 
-        for date in dates:
-            try:
-                organism.evaluate_fitness(self._tickers, date)
-            except (ModelError, AttributeError) as error:
-                organism.die()
-                self._logger.error(f"Удаляю - {error}\n")
+        self._metrics.update(organism.id, organism.date, organism.timer, organism.llh, organism.ir)
+        if (margin := self._get_margin(organism)) is not None:
+            organism.save_forecast()
 
-                return None
+        return margin
 
-        return self._get_margin(organism)
+    def _die(self, organism: population.Organism) -> None:
+        """Удаляет организм из популяции и индекса метрик."""
+        organism.die()
+        self._metrics.remove(organism.id)
 
     def _get_margin(self, org: population.Organism) -> tuple[float, float] | None:
         """Используется тестирование разницы llh и ret против самого старого организма.
@@ -186,6 +259,7 @@ class Evolution:  # noqa: WPS214
 
         for metric in ("ir", "llh"):
             median, upper, maximum = _select_worst_bound(
+                self._metrics,
                 candidate={"date": org.date, "llh": org.llh, "ir": org.ir},
                 metric=metric,
             )
@@ -202,7 +276,7 @@ class Evolution:  # noqa: WPS214
             )
 
             if upper < 0:
-                org.die()
+                self._die(org)
                 self._logger.info("Исключен из популяции...\n")
 
                 return None
@@ -210,19 +284,13 @@ class Evolution:  # noqa: WPS214
             upper_bound = max(upper_bound, upper)
 
         org.upper_bound = upper_bound
-        time_score = _time_delta(org)
+        time_score = self._metrics.timer_percentile(org.timer)
 
         self._logger.info(f"Upper bound - {upper_bound:.4f}, Slowness - {time_score:.2%}\n")  # noqa: WPS221
 
         return upper_bound, time_score
 
 
-def _time_delta(org):
-    times = [doc["timer"] for doc in population.get_metrics() if "timer" in doc]
-
-    return stats.percentileofscore(times, org.timer, kind="mean") / 100
-
-
 def _check_time_range() -> bool:
     hour = datetime.datetime.today().hour
 
@@ -238,51 +306,46 @@ def _check_time_range() -> bool:
     return before_midnight or after_midnight
 
 
-def _select_worst_bound(candidate: dict, metric: str) -> tuple[float, float, float]:
-    """Выбирает минимальное значение верхней границы доверительного интервала.
+def _window_end(now: Optional[datetime.datetime] = None) -> Optional[float]:
+    """Время окончания текущего периода работы эволюции в секундах от начала эпохи.
 
-    Если данный организм не уступает целевому организму, то верхняя граница будет положительной.
+    Для круглосуточной работы возвращается None.
     """
+    if config.START_EVOLVE_HOUR == config.STOP_EVOLVE_HOUR:
+        return None
 
-    diff = _aligned_diff(candidate, metric)
-
-    bounds = map(
-        lambda size: _test_diff(diff[:size]),
-        range(1, len(diff) + 1),
-    )
-
-    return min(
-        bounds,
-        key=lambda bound: bound[1],
-    )
-
-
-def _aligned_diff(candidate: dict, metric: str) -> list[float]:
-    comp = []
+    now = now or datetime.datetime.now()
+    end = now.replace(hour=config.STOP_EVOLVE_HOUR, minute=0, second=0, microsecond=0)
+    if end <= now:
+        end += datetime.timedelta(days=1)
 
-    for base in population.get_metrics():
-        metrics = base[metric]
+    return end.timestamp()
 
-        if base["date"] < candidate["date"]:
-            metrics = [np.nan] + metrics
 
-        scores = len(candidate[metric])
+def _fits_window(timer: Optional[float]) -> bool:
+    """Прогнозное время обучения в наносекундах укладывается в остаток периода работы эволюции."""
+    if timer is None or (window_end := _window_end()) is None:
+        return True
 
-        metrics = metrics[:scores]
-        metrics = metrics + [np.nan] * (scores - len(metrics))
+    return timer < (window_end - time.time()) * 10**9
 
-        comp.append(metrics)
 
-    comp = np.nanmedian(np.array(comp), axis=0)
+def _select_worst_bound(
+    metrics_index: metrics.MetricsIndex,
+    candidate: dict,
+    metric: str,
+) -> tuple[float, float, float]:
+    """Выбирает минимальное значение верхней границы доверительного интервала.
 
-    return list(map(operator.sub, candidate[metric], comp))
+    Если данный организм не уступает целевому организму, то верхняя граница будет положительной.
+    """
 
+    diff = metrics_index.aligned_diff(candidate["date"], candidate[metric], metric)
 
-def _test_diff(diff: list[float]) -> tuple[float, float, float]:
-    """Последовательный тест на медианную разницу с учетом множественного тестирования.
+    medians, _, upper = seq.median_conf_bounds_prefixes(diff, config.P_VALUE / population.count())
+    maximums = np.maximum.accumulate(diff)
 
-    Тестирование одностороннее, поэтому p-value нужно умножить на 2, но проводится 2 раза.
-    """
-    _, upper = seq.median_conf_bound(diff, config.P_VALUE / population.count())
+    # Как и min по списку, игнорирует NaN, кроме случая NaN в первой границе
+    worst = 0 if np.isnan(upper[0]) else int(np.nanargmin(upper))
 
-    return float(np.median(diff)), upper, np.max(diff)
+    return float(medians[worst]), float(upper[worst]), float(maximums[worst])
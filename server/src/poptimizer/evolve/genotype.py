@@ -4,6 +4,8 @@ import types
 from collections import UserDict
 from typing import Optional, Type
 
+import numpy as np
+
 from poptimizer.dl import PhenotypeData
 from poptimizer.evolve import chromosomes
 
@@ -67,14 +69,37 @@ class Genotype(UserDict):
             chromosome.change_phenotype(phenotype)
         return phenotype
 
+    def bounds(self) -> tuple[np.ndarray, np.ndarray]:
+        """Нижние и верхние границы генов в порядке их размещения в векторе."""
+        lower, upper = zip(*(chromosome.bounds() for chromosome in self.values()))
+
+        return np.concatenate(lower), np.concatenate(upper)
+
+    def to_vector(self) -> np.ndarray:
+        """Значения всех генов в виде вектора — хромосомы и гены в них следуют в фиксированном порядке."""
+        return np.concatenate([chromosome.to_vector() for chromosome in self.values()])
+
+    def from_vector(self, vector: np.ndarray) -> "Genotype":
+        """Копия генотипа со значениями генов из вектора."""
+        genotype = copy.copy(self)
+        start = 0
+        for key, chromosome in self.items():
+            end = start + len(chromosome.gene_names())
+            genotype[key] = chromosome.from_vector(vector[start:end])
+            start = end
+
+        return genotype
+
     def make_child(
         self,
         parent1: "Genotype",
         parent2: "Genotype",
         scale: float,
     ) -> "Genotype":
-        """Реализует мутацию в рамках дифференциальной эволюции отдельных хромосом."""
-        child = copy.deepcopy(self)
-        for key in child:
-            child[key] = self[key].make_child(parent1[key], parent2[key], scale)
-        return child
+        """Реализует мутацию в рамках дифференциальной эволюции.
+
+        Мутация всех генов с отражением от границ осуществляется сразу для векторного представления генотипа.
+        """
+        vector = chromosomes.mutate(self.to_vector(), parent1.to_vector(), parent2.to_vector(), scale, *self.bounds())
+
+        return self.from_vector(vector)
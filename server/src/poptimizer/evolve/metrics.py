@@ -0,0 +1,130 @@
+"""Индекс метрик популяции для последовательных тестов."""
+from typing import Any, Final, Iterable, Optional
+
+import bson
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Метрики организмов, по которым проводятся последовательные тесты
+METRICS: Final = ("llh", "ir")
+
+
+class MetricsIndex:
+    """Метрики популяции в виде массивов NumPy.
+
+    Для каждого организма с оценками хранится дата последней оценки, время обучения и матрицы метрик, в которых
+    последняя оценка находится в первом столбце, а отсутствующие оценки заполнены NaN. Индекс загружается один раз за
+    шаг эволюции и обновляется при оценке или удалении организмов, поэтому сравнение с популяцией не требует запросов к
+    MongoDB.
+    """
+
+    def __init__(self) -> None:
+        """Создает пустой индекс."""
+        self._rows: dict[bson.ObjectId, int] = {}
+        self._dates = np.empty(0, dtype="datetime64[ns]")
+        self._timers = np.empty(0)
+        self._scores = {metric: np.empty((0, 0)) for metric in METRICS}
+
+    def __len__(self) -> int:
+        """Количество организмов в индексе."""
+        return len(self._rows)
+
+    def load(self, docs: Iterable[dict[str, Any]]) -> None:
+        """Загружает метрики организмов из документов MongoDB."""
+        docs = list(docs)
+
+        self._rows = {doc["_id"]: row for row, doc in enumerate(docs)}
+        self._dates = np.array([_to_datetime64(doc["date"]) for doc in docs], dtype="datetime64[ns]")
+        self._timers = np.array([doc.get("timer", np.nan) for doc in docs], dtype=float)
+        self._scores = {metric: _pad([doc[metric] for doc in docs]) for metric in METRICS}
+
+    def update(
+        self,
+        id_: bson.ObjectId,
+        date: Optional[pd.Timestamp],
+        timer: float,
+        llh: list[float],
+        ir: list[float],
+    ) -> None:
+        """Добавляет или обновляет метрики организма.
+
+        Организмы без оценок в индекс не добавляются.
+        """
+        if date is None:
+            self.remove(id_)
+
+            return
+
+        row = self._rows.get(id_)
+        if row is None:
+            row = len(self._rows)
+            self._rows[id_] = row
+            self._dates = np.append(self._dates, _to_datetime64(date))
+            self._timers = np.append(self._timers, np.nan)
+            for metric in METRICS:
+                matrix = self._scores[metric]
+                self._scores[metric] = np.vstack([matrix, np.full((1, matrix.shape[1]), np.nan)])
+
+        self._dates[row] = _to_datetime64(date)
+        self._timers[row] = timer
+        scores = {"llh": llh, "ir": ir}
+        for metric in METRICS:
+            self._scores[metric] = _set_row(self._scores[metric], row, scores[metric])
+
+    def remove(self, id_: bson.ObjectId) -> None:
+        """Удаляет метрики организма при его наличии в индексе."""
+        if (row := self._rows.pop(id_, None)) is None:
+            return
+
+        self._rows = {key: pos - (pos > row) for key, pos in self._rows.items()}
+        self._dates = np.delete(self._dates, row)
+        self._timers = np.delete(self._timers, row)
+        self._scores = {metric: np.delete(matrix, row, axis=0) for metric, matrix in self._scores.items()}
+
+    def aligned_diff(self, date: pd.Timestamp, scores: list[float], metric: str) -> np.ndarray:
+        """Разница метрик кандидата с медианой по популяции.
+
+        Оценки организмов с более ранней датой последней оценки сдвигаются на одну позицию для выравнивания по датам,
+        а недостающие оценки не учитываются при расчете медианы.
+        """
+        size = len(scores)
+        matrix = self._scores[metric]
+        if matrix.shape[1] < size:
+            matrix = np.pad(matrix, ((0, 0), (0, size - matrix.shape[1])), constant_values=np.nan)
+
+        shifted = np.hstack([np.full((len(matrix), 1), np.nan), matrix[:, : size - 1]])
+        comp = np.where((self._dates < _to_datetime64(date))[:, np.newaxis], shifted, matrix[:, :size])
+
+        return np.array(scores) - np.nanmedian(comp, axis=0)
+
+    def timer_percentile(self, timer: float) -> float:
+        """Доля организмов популяции, обучающихся быстрее заданного времени."""
+        timers = self._timers[~np.isnan(self._timers)]
+
+        return stats.percentileofscore(timers, timer, kind="mean") / 100
+
+
+def _to_datetime64(date: Any) -> np.datetime64:
+    return pd.Timestamp(date).to_datetime64()
+
+
+def _pad(scores: list[list[float]]) -> np.ndarray:
+    """Матрица оценок, дополненная NaN до одинаковой длины."""
+    width = max(map(len, scores), default=0)
+    matrix = np.full((len(scores), width), np.nan)
+    for row, row_scores in enumerate(scores):
+        matrix[row, : len(row_scores)] = row_scores
+
+    return matrix
+
+
+def _set_row(matrix: np.ndarray, row: int, scores: list[float]) -> np.ndarray:
+    """Заменяет строку оценок с расширением матрицы при необходимости."""
+    if (width := len(scores)) > matrix.shape[1]:
+        matrix = np.pad(matrix, ((0, 0), (0, width - matrix.shape[1])), constant_values=np.nan)
+
+    matrix[row] = np.nan
+    matrix[row, :width] = scores
+
+    return matrix
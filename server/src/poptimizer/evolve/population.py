@@ -1,10 +1,10 @@
 """Класс организма и операции с популяцией организмов."""
-import contextlib
 import datetime
 import logging
+import pathlib
 import random
 import time
-from typing import Iterable, Iterator, Optional
+from typing import Any, Iterable, Iterator, Optional
 
 import bson
 import numpy as np
@@ -13,7 +13,7 @@ import pymongo
 
 from poptimizer import config
 from poptimizer.dl import Forecast, Model
-from poptimizer.evolve import store
+from poptimizer.evolve import cost, store
 from poptimizer.evolve.genotype import Genotype
 
 # Преобразование времени в секунды
@@ -30,6 +30,10 @@ class ForecastError(config.POptimizerError):
     """Отсутствующий прогноз."""
 
 
+class EvaluationDatesError(config.POptimizerError):
+    """Даты оценки не совпадают с последними торговыми датами, для которых сформированы примеры."""
+
+
 class Organism:  # noqa: WPS214
     """Организм и основные операции с ним.
 
@@ -41,9 +45,11 @@ class Organism:  # noqa: WPS214
         *,
         _id: Optional[bson.ObjectId] = None,
         genotype: Optional[Genotype] = None,
+        doc: Optional[dict[str, Any]] = None,
     ) -> None:
-        """Загружает организм из базы данных."""
-        self._doc = store.Doc(id_=_id, genotype=genotype)
+        """Загружает организм из базы данных или создает его на основе уже полученного документа."""
+        self._doc = store.Doc(id_=_id, genotype=genotype, doc=doc)
+        self._eval_model: Optional[Model] = None
 
     def __str__(self) -> str:
         """Текстовое представление генотипа организма."""
@@ -96,6 +102,11 @@ class Organism:  # noqa: WPS214
         """List of information ratios."""
         return self._doc.ir
 
+    @property
+    def cost(self) -> Optional[list[float]]:
+        """Характеристики фенотипа, определяющие время обучения, сохраненные при последнем обучении с нуля."""
+        return self._doc.cost
+
     @property
     def tickers(self) -> list[str]:
         return self._doc.tickers
@@ -111,25 +122,99 @@ class Organism:  # noqa: WPS214
         self._doc.ub = ub
         self._doc.save()
 
-    def retrain(self, tickers: tuple[str, ...], end: pd.Timestamp):
-        """Переобучает модель."""
+    def retrain(
+        self,
+        tickers: tuple[str, ...],
+        end: pd.Timestamp,
+        screening_llh: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ):
+        """Переобучает модель.
+
+        При наличии порогового значения правдоподобия неперспективные модели отсеиваются после части шагов обучения.
+
+        Если сохраненная модель обучена на более ранних данных, то она дообучается по сокращенному графику, пока
+        количество дообучений подряд не достигнет WARM_START_MAX. Время обучения обновляется только при обучении с
+        нуля, чтобы оставаться сопоставимым между организмами.
+
+        Состояние обучения периодически сохраняется в контрольной точке организма. При наступлении deadline обучение
+        прерывается, а при следующем переобучении на тех же данных продолжается с контрольной точки.
+        """
+        doc = self._doc
+        warm_start = None
+        if _can_warm_start(doc, end):
+            warm_start = (doc.model, tuple(doc.tickers))
+
+        phenotype = self.genotype.get_phenotype()
         timer = time.monotonic_ns()
-        model = Model(tuple(tickers), end, self.genotype.get_phenotype(), None)
+        model = Model(
+            tuple(tickers),
+            end,
+            phenotype,
+            None,
+            screening_llh,
+            warm_start,
+            checkpoint=_checkpoint_path(self.id),
+            deadline=deadline,
+        )
         model.quality_metrics
-        self._doc.model = bytes(model)
-        self._doc.tickers = list(tickers)
-        self._doc.timer = time.monotonic_ns() - timer
+        doc.model = bytes(model)
+        doc.forecast = None
+        self._eval_model = None
+        doc.tickers = list(tickers)
+        doc.trained = end
+        doc.proxy = model.proxy_llh
+
+        if model.warm_started:
+            doc.warm += 1
+        else:
+            doc.timer = time.monotonic_ns() - timer + model.restored_ns
+            doc.cost = cost.features(phenotype, len(tickers)).tolist()
+            doc.warm = 0
 
     def evaluate_fitness(self, tickers: tuple[str, ...], end: pd.Timestamp) -> list[float]:
         """Вычисляет качество организма."""
+        self._check_evaluation(tickers, [end])
+
+        model = Model(tuple(tickers), end, self.genotype.get_phenotype(), self._doc.model)
+        self._add_scores(end, *model.quality_metrics)
+        self._keep_eval_model(model, end)
+        self._doc.save()
+
+        return self.llh
+
+    def evaluate_fitness_dates(self, tickers: tuple[str, ...], dates: list[pd.Timestamp]) -> list[float]:
+        """Вычисляет качество организма для нескольких последовательных торговых дат.
+
+        Модель загружается один раз, а примеры для всех дат оцениваются за один проход, поэтому результат совпадает с
+        последовательной оценкой на каждую из дат в заданном порядке. Если даты не совпадают с последними торговыми
+        датами, для которых сформированы примеры, выбрасывается исключение.
+        """
+        if len(dates) == 1:
+            return self.evaluate_fitness(tickers, dates[0])
+
+        self._check_evaluation(tickers, dates)
+
+        model = Model(tuple(tickers), max(dates), self.genotype.get_phenotype(), self._doc.model)
+        metrics = model.quality_metrics_history(len(dates))
+        if list(metrics) != sorted(dates):
+            raise EvaluationDatesError(f"{sorted(dates)} != {list(metrics)}")
+
+        for date in dates:
+            self._add_scores(date, *metrics[date])
+        self._keep_eval_model(model, max(dates))
+        self._doc.save()
+
+        return self.llh
+
+    def _check_evaluation(self, tickers: tuple[str, ...], dates: list[pd.Timestamp]) -> None:
         doc = self._doc
-        tickers = list(tickers)
 
-        if end == self.date or doc.model is None or tickers != doc.tickers:
+        if self.date in dates or doc.model is None or list(tickers) != doc.tickers:
             raise ReevaluationError
 
-        model = Model(tuple(tickers), end, self.genotype.get_phenotype(), doc.model)
-        llh, ir = model.quality_metrics
+    def _add_scores(self, end: pd.Timestamp, llh: float, ir: float) -> None:
+        doc = self._doc
 
         if self.date is None or end > self.date:
             doc.llh = [llh] + doc.llh
@@ -141,17 +226,53 @@ class Organism:  # noqa: WPS214
 
         doc.wins = len(doc.llh)
 
-        doc.save()
+    def save_forecast(self) -> None:
+        """Сохраняет прогноз на дату последней оценки.
 
-        return self.llh
+        Прогноз рассчитывается моделью с весами, уже загруженными для оценки на эту дату, поэтому не требует повторной
+        загрузки весов. Вызывается только для организмов, оставшихся в популяции после оценки, а ежедневное обновление
+        прогнозов популяции использует сохраненные значения без расчетов сети.
+        """
+        if (model := self._eval_model) is None:
+            return
+
+        self._eval_model = None
+        means, stds = model.forecast_moments()
+        self._doc.forecast = {
+            "date": self.date,
+            "tickers": means.index.tolist(),
+            "mean": means.tolist(),
+            "std": stds.tolist(),
+        }
+        self._doc.save()
+
+    def _keep_eval_model(self, model: Model, end: pd.Timestamp) -> None:
+        """Сохраняет в памяти модель, загруженную для оценки на последнюю дату, для расчета прогноза."""
+        self._eval_model = model if end == self.date else None
+
+    def _saved_forecast(
+        self,
+        tickers: tuple[str, ...],
+        end: pd.Timestamp,
+    ) -> Optional[tuple[pd.Series, pd.Series]]:
+        """Сохраненные прогнозы доходности и СКО для заданных тикеров и даты."""
+        saved = self._doc.forecast
+        if saved is None or saved["date"] != end or saved.get("tickers") != list(tickers):
+            return None
+
+        return pd.Series(saved["mean"], index=list(tickers)), pd.Series(saved["std"], index=list(tickers))
 
     def die(self) -> None:
-        """Организм удаляется из популяции."""
+        """Организм удаляется из популяции вместе с контрольной точкой обучения."""
         self._doc.delete()
+        _checkpoint_path(self.id).unlink(missing_ok=True)
 
-    def make_child(self, scale: float) -> "Organism":
-        """Создает новый организм с помощью дифференциальной мутации."""
-        parent1, parent2 = _get_parents()
+    def make_child(self, scale: float, parents_pool: Optional[list["Organism"]] = None) -> "Organism":
+        """Создает новый организм с помощью дифференциальной мутации.
+
+        Родители выбираются из заранее полученной выборки организмов, а при ее отсутствии — запросом к базе.
+        """
+        parent1, parent2 = _get_parents(parents_pool)
         child_genotype = self.genotype.make_child(parent1.genotype, parent2.genotype, scale)
 
         return Organism(genotype=child_genotype)
@@ -160,14 +281,21 @@ class Organism:  # noqa: WPS214
         """Выдает прогноз для текущего организма.
 
         При наличии натренированной модели, которая составлена на предыдущей статистике и для таких же
-        тикеров, будет использованы сохраненные веса сети, или выбрасывается исключение.
+        тикеров, будет использованы сохраненные веса сети, или выбрасывается исключение. Если для этих тикеров и даты
+        уже сохранен прогноз, то используется он.
         """
         doc = self._doc
-        if (pickled_model := doc.model) is None or tickers != tuple(doc.tickers):
+        if doc.tickers is None or tickers != tuple(doc.tickers):
+            raise ForecastError
+
+        if (moments := self._saved_forecast(tickers, end)) is not None:
+            model = Model(tickers, end, self.genotype.get_phenotype())
+        elif (pickled_model := doc.model) is not None:
+            model = Model(tickers, end, self.genotype.get_phenotype(), pickled_model)
+        else:
             raise ForecastError
 
-        model = Model(tickers, end, self.genotype.get_phenotype(), pickled_model)
-        forecast = model.forecast()
+        forecast = model.forecast(moments)
         if np.any(np.isnan(forecast.cov)) or np.any(np.isinf(forecast.cov)):
             self.die()
             raise ForecastError
@@ -179,6 +307,19 @@ class Organism:  # noqa: WPS214
         self._doc.save()
 
 
+def _checkpoint_path(id_: bson.ObjectId) -> pathlib.Path:
+    """Файл контрольной точки обучения организма."""
+    return config.CHECKPOINTS_PATH / f"{id_}.pt"
+
+
+def _can_warm_start(doc: store.Doc, end: pd.Timestamp) -> bool:
+    """Дообучение возможно только для модели, обученной на данных до указанной даты."""
+    if doc.model is None or doc.trained is None:
+        return False
+
+    return end >= doc.trained and doc.warm < config.WARM_START_MAX
+
+
 def _format_scores_list(scores: list[float]) -> str:
     block = "-"
     if scores:
@@ -207,90 +348,115 @@ def create_new_organism() -> Organism:
     return org
 
 
-def _get_parents() -> tuple[Organism, Organism]:
-    """Получить родителей.
-
-    Если популяция меньше 2 организмов, то используются два организма с базовыми случайными генотипами.
-    """
-    collection = store.get_collection()
-
+def get_parents_pool(size: int) -> list[Organism]:
+    """Случайная выборка организмов для выбора родителей нескольких потомков одним запросом."""
     pipeline = [
-        {"$project": {"_id": True}},
-        {"$sample": {"size": 2}},
+        {"$sample": {"size": size}},
+        {"$project": {"genotype": True}},
     ]
 
-    parents = tuple(Organism(**doc) for doc in collection.aggregate(pipeline))
+    return [Organism(doc=doc) for doc in store.get_collection().aggregate(pipeline)]
 
-    if len(parents) == 2:
-        return parents[0], parents[1]
 
-    return Organism(), Organism()
+def _get_parents(pool: Optional[list[Organism]] = None) -> tuple[Organism, Organism]:
+    """Получить двух различных родителей из выборки организмов.
 
+    Если выборка не задана, то она запрашивается из базы. Если в выборке меньше 2 организмов, то используются два
+    организма с базовыми случайными генотипами.
+    """
+    if pool is None:
+        pool = get_parents_pool(2)
 
-def _aggregate_oldest(limit: int, first_steps: Optional[list[dict]] = None):
-    """Берет первые документы по возрастанию id.
+    if len(pool) >= 2:
+        parent1, parent2 = random.sample(pool, 2)
 
-    При наличии добавляет первый шаг агрегации.
-    """
-    pipeline = [
-        {"$project": {"ir": True, "llh": True, "date": True, "timer": True}},
-        {"$sort": {"_id": pymongo.ASCENDING}},
-        {"$limit": limit},
-    ]
-    if first_steps:
-        pipeline = first_steps + pipeline
+        return parent1, parent2
 
-    return store.get_collection().aggregate(pipeline)
+    return Organism(), Organism()
+
+
+def _find_oldest(query_filter: Optional[dict] = None):
+    """Берет документы по возрастанию id с метриками без весов моделей."""
+    return store.get_collection().find(
+        filter=query_filter or {},
+        projection={"ir": True, "llh": True, "date": True, "timer": True},
+        sort=[("_id", pymongo.ASCENDING)],
+    )
 
 
 def get_next_one() -> Optional[Organism]:
     """Выдает организмы по возрастанию даты.
 
     Второй критерий - или самый мало обученный, или с максимальной верхней границе доверительного интервала.
+    Запрос обслуживается индексом и не читает документы.
     """
-    selector = random.choice(({"ub": pymongo.DESCENDING}, {"wins": pymongo.ASCENDING}))
+    selector = random.choice((("ub", pymongo.DESCENDING), ("wins", pymongo.ASCENDING)))
 
-    pipeline = [
-        {"$project": {"date": True, "ub": True, "wins": True}},
-        {"$sort": {"date": pymongo.ASCENDING} | selector},
-        {"$limit": 1},
-    ]
-
-    doc = next(store.get_collection().aggregate(pipeline))
+    doc = store.get_collection().find_one(
+        projection={"_id": True},
+        sort=[("date", pymongo.ASCENDING), selector, ("_id", pymongo.ASCENDING)],
+    )
 
     return doc and Organism(_id=doc["_id"])
 
 
 def get_metrics() -> Iterable[dict[str, list[float]]]:
     """Данные о ключевых параметрах популяции."""
-    yield from _aggregate_oldest(count(), [{"$match": {"date": {"$exists": True}}}])
+    yield from _find_oldest({"date": {"$exists": True}})
+
 
+def get_all(fields: Optional[Iterable[str]] = None) -> Iterator[Organism]:
+    """Получить все организмы одним запросом.
 
-def get_all() -> Iterator[Organism]:
-    """Получить все организмы."""
-    for doc in list(_aggregate_oldest(count())):
-        with contextlib.suppress(store.IdError):
-            yield Organism(_id=doc["_id"])
+    Организмы создаются на основе полученных документов. При указании полей загружаются только они, а остальные поля
+    принимают значения по умолчанию. Веса моделей загружаются при первом обращении к ним.
+    """
+    projection = {store.MODEL: False}
+    if fields is not None:
+        projection = dict.fromkeys([*fields, store.WEIGHTS], True)
+
+    cursor = store.get_collection().find(projection=projection, sort=[(store.ID, pymongo.ASCENDING)])
+
+    for doc in cursor:
+        yield Organism(doc=doc)
 
 
 def min_max_date() -> tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
-    """Минимальная и максимальная дата в популяции."""
+    """Минимальная и максимальная дата в популяции.
+
+    Берутся крайние значения индекса по дате без чтения документов.
+    """
     collection = store.get_collection()
 
-    pipeline = [
-        {
-            "$group": {
-                "_id": {},
-                "min": {"$min": "$date"},
-                "max": {"$max": "$date"},
-            },
-        },
+    dates = [
+        collection.find_one(
+            filter={"date": {"$type": "date"}},
+            projection={"date": True, "_id": False},
+            sort=[("date", direction)],
+        )
+        for direction in (pymongo.ASCENDING, pymongo.DESCENDING)
     ]
-    doc = next(collection.aggregate(pipeline), {})
-    if doc.get("max") is None:
+    if dates[1] is None:
         return None, None
 
-    return pd.Timestamp(doc["min"]), pd.Timestamp(doc["max"])
+    return pd.Timestamp(dates[0]["date"]), pd.Timestamp(dates[1]["date"])
+
+
+def median_proxy() -> Optional[float]:
+    """Медиана правдоподобия на обучении после части шагов по популяции.
+
+    Используется в качестве порога для досрочного прекращения обучения неперспективных моделей.
+    """
+    collection = store.get_collection()
+    cursor = collection.find(filter={"proxy": {"$type": "double"}}, projection=["proxy"])
+
+    proxies = np.array([doc["proxy"] for doc in cursor])
+    proxies = proxies[~np.isnan(proxies)]
+
+    if not proxies.size:
+        return None
+
+    return float(np.median(proxies))
 
 
 def print_stat() -> None:
@@ -334,7 +500,7 @@ def min_scores() -> int:
     db_find = collection.find
     request = {
         "filter": {"wins": {"$exists": True}},
-        "projection": ["wins"],
+        "projection": {"wins": True, "_id": False},
         "sort": [("wins", pymongo.ASCENDING)],
         "limit": 1,
     }
@@ -353,7 +519,7 @@ def max_scores() -> int:
     db_find = collection.find
     request = {
         "filter": {"wins": {"$exists": True}},
-        "projection": ["wins"],
+        "projection": {"wins": True, "_id": False},
         "sort": [("wins", pymongo.DESCENDING)],
         "limit": 1,
     }
@@ -7,19 +7,21 @@ https://arxiv.org/abs/1810.08240
 Sequential estimation of quantiles with applications to A/B-testing and best-arm identification
 https://arxiv.org/abs/1906.09712
 """
-import itertools
+import bisect
+import functools
+import math
 
 import numpy as np
 from scipy import special, stats
 
 
 def _median_conf_radius(
-    t: int,  # noqa: WPS111
+    t: int | np.ndarray,  # noqa: WPS111
     alfa: float,
     m: int = 1,  # noqa: WPS111
     nu: float = 2.04,
     s: float = 1.4,  # noqa: WPS111
-) -> float:
+) -> float | np.ndarray:
     """Отклонение выборочной медианы от фактического значения при проведении последовательных тестов.
 
     Данная функция реализует расчет сужающейся последовательности доверительных интервалов для
@@ -50,7 +52,8 @@ def _median_conf_radius(
 
     :param t:
         Номер интервала для которого осуществляется процедура последовательного тестирования. Тесты
-        начинаются с момента времени t >= n и осуществляются последовательно для каждого t.
+        начинаются с момента времени t >= n и осуществляются последовательно для каждого t. Может быть
+        массивом номеров интервалов — тогда радиусы рассчитываются для всех значений сразу.
     :param alfa:
         Значение p-value для процедуры последовательного тестирования. Вероятность пробить
         последовательность доверительных интервалов при тестировании для всех t >= n меньше alfa.
@@ -79,6 +82,7 @@ def _median_conf_radius(
     return k1 * 0.5 * (l_t / t) ** 0.5
 
 
+@functools.lru_cache(maxsize=None)
 def minimum_bounding_n(alfa: float) -> int:
     """Подбор минимального ограничивающего n для заданного уровня значимости.
 
@@ -88,10 +92,18 @@ def minimum_bounding_n(alfa: float) -> int:
 
     Данная функция подбирает значение n так, чтобы при n = t интервалы накладывали хотя бы минимальное
     ограничение на величину медианы, то есть расчетный доверительный радиус был бы меньше 0.5.
+
+    При t = m = n повторный логарифм не зависит от n, поэтому радиус убывает как 1 / sqrt(n), и n
+    рассчитывается в явном виде с проверкой на ошибки округления. Результаты кэшируются для каждого alfa.
     """
-    for n in itertools.count(1):  # noqa: WPS111
-        if _median_conf_radius(n, alfa, n) < 0.5:  # noqa: WPS459
-            return n
+    n = max(1, math.floor(_median_conf_radius(1, alfa, 1) ** 2 * 4) + 1)  # noqa: WPS111
+
+    while n > 1 and _median_conf_radius(n - 1, alfa, n - 1) < 0.5:  # noqa: WPS459
+        n -= 1  # noqa: WPS111
+    while _median_conf_radius(n, alfa, n) >= 0.5:  # noqa: WPS459
+        n += 1  # noqa: WPS111
+
+    return n
 
 
 def median_conf_bound(sample: list[float], p_value: float) -> tuple[float, float]:
@@ -112,3 +124,56 @@ def median_conf_bound(sample: list[float], p_value: float) -> tuple[float, float
             [(0.5 - radius) * 100, (0.5 + radius) * 100],
         ),
     )
+
+
+def median_conf_bounds_prefixes(
+    sample: list[float] | np.ndarray,
+    p_value: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Выборочные медианы и доверительные интервалы для медианы всех начальных отрезков выборки.
+
+    Результат для отрезка длины t совпадает с np.median и median_conf_bound для sample[:t], но рассчитывается за один
+    проход с поддержанием упорядоченной выборки вместо сортировки каждого отрезка.
+    """
+    size = len(sample)
+    n = minimum_bounding_n(p_value)  # noqa: WPS111
+
+    medians = np.full(size, np.nan)
+    lower = np.full(size, -np.inf)
+    upper = np.full(size, np.inf)
+
+    radii = _median_conf_radius(np.arange(n, max(n, size) + 1), p_value, n)
+
+    ordered = []
+    has_nan = False
+    for t, value in enumerate(sample, 1):  # noqa: WPS111
+        bisect.insort(ordered, value, key=_nan_last)
+        has_nan = has_nan or math.isnan(value)
+
+        if not has_nan:
+            medians[t - 1] = (ordered[(t - 1) // 2] + ordered[t // 2]) / 2
+
+        if t >= n:
+            radius = radii[t - n]
+            lower[t - 1] = _score_at_percentile(ordered, (0.5 - radius) * 100)
+            upper[t - 1] = _score_at_percentile(ordered, (0.5 + radius) * 100)
+
+    return medians, lower, upper
+
+
+def _nan_last(value: float) -> tuple[bool, float]:
+    """Ключ сортировки, помещающий NaN в конец, как np.sort."""
+    return math.isnan(value), value
+
+
+def _score_at_percentile(ordered: list[float], per: float) -> float:
+    """Перцентиль упорядоченной выборки с линейной интерполяцией, как в stats.scoreatpercentile."""
+    idx = per / 100 * (len(ordered) - 1)
+    pos = int(idx)
+
+    if pos == idx:
+        return ordered[pos]
+
+    weights = np.array([pos + 1 - idx, idx - pos])
+
+    return np.add.reduce(np.array(ordered[pos : pos + 2]) * weights) / weights.sum()
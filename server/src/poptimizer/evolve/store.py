@@ -1,7 +1,11 @@
 """Доступ к данным для эволюции."""
+import atexit
+import zlib
 from typing import Any, Callable, Final, Optional
 
 import bson
+import gridfs
+import pymongo
 from pymongo.collection import Collection
 
 from poptimizer.config import POptimizerError
@@ -13,11 +17,97 @@ _COLLECTION = MONGO_CLIENT[DB]["models"]
 
 # Название столбца с индексом
 ID: Final = "_id"
+# Название поля с весами модели, которые хранятся отдельно от документа
+MODEL: Final = "model"
+# Название поля со ссылкой на файл весов модели в GridFS
+WEIGHTS: Final = "weights"
+
+# Индексы для выбора очередного организма, статистики по количеству оценок и диапазону дат. Включение _id позволяет
+# выполнять запросы с сортировкой по ним без чтения документов
+_INDEXES: Final = (
+    pymongo.IndexModel([("date", pymongo.ASCENDING), ("ub", pymongo.DESCENDING), (ID, pymongo.ASCENDING)]),
+    pymongo.IndexModel([("date", pymongo.ASCENDING), ("wins", pymongo.ASCENDING), (ID, pymongo.ASCENDING)]),
+    pymongo.IndexModel([("wins", pymongo.ASCENDING)]),
+)
+# Коллекции, для которых уже созданы индексы
+_INDEXED: Final[set[str]] = set()
+
+# Отложенные обновления документов, объединенные для каждого документа
+_PENDING: Final[dict[bson.ObjectId, tuple[Collection, dict[str, dict[str, Any]]]]] = {}
 
 
 def get_collection() -> Collection:
-    """Коллекция для хранения моделей."""
-    return _COLLECTION
+    """Коллекция для хранения моделей.
+
+    При первом обращении к коллекции создаются необходимые индексы. Отложенные обновления не записываются, поэтому
+    запросы по популяции учитывают изменения, записанные последним вызовом flush.
+    """
+    collection = _COLLECTION
+    if collection.full_name not in _INDEXED:
+        collection.create_indexes(list(_INDEXES))
+        _INDEXED.add(collection.full_name)
+
+    return collection
+
+
+def flush() -> None:
+    """Записывает отложенные обновления документов одним пакетом для каждой коллекции.
+
+    Вызывается в конце шага эволюции и при завершении работы.
+    """
+    batches = {}
+    while _PENDING:
+        id_, (collection, update) = _PENDING.popitem()
+        _, requests = batches.setdefault(collection.full_name, (collection, []))
+        requests.append(pymongo.UpdateOne({ID: id_}, update, upsert=True))
+
+    for collection, requests in batches.values():
+        collection.bulk_write(requests, ordered=False)
+
+
+atexit.register(flush)
+
+
+def _defer_update(id_: bson.ObjectId, update: dict[str, dict[str, Any]]) -> None:
+    """Объединяет обновление документа с ранее отложенными обновлениями."""
+    _, pending = _PENDING.setdefault(id_, (_COLLECTION, {}))
+    for operator, fields in update.items():
+        pending.setdefault(operator, {}).update(fields)
+
+
+def get_weights_fs() -> gridfs.GridFS:
+    """Хранилище сжатых весов моделей в GridFS рядом с коллекцией моделей."""
+    collection = get_collection()
+
+    return gridfs.GridFS(collection.database, collection=f"{collection.name}_weights")
+
+
+def _load_weights(id_: bson.ObjectId, file_id: Optional[bson.ObjectId]) -> Optional[bytes]:
+    """Загружает веса модели из GridFS по ссылке или из документа, если они сохранены в старом формате.
+
+    Если ссылка не была загружена вместе с документом, она запрашивается из базы. Файлы, сохраненные до появления
+    ссылки, имеют идентификатор документа.
+    """
+    doc = {}
+    if file_id is None:
+        doc = get_collection().find_one({ID: id_}, projection=[WEIGHTS, MODEL]) or {}
+        file_id = doc.get(WEIGHTS, id_)
+
+    if file_id is None:
+        return None
+
+    try:
+        return zlib.decompress(get_weights_fs().get(file_id).read())
+    except gridfs.NoFile:
+        return doc.get(MODEL)
+
+
+def _old_weights_file(doc: Optional[dict[str, Any]], id_: bson.ObjectId) -> Optional[bson.ObjectId]:
+    """Файл весов, на который ссылался документ до изменения, с учетом файлов старого формата."""
+    if doc is None:
+        return None
+
+    return doc.get(WEIGHTS, id_)
 
 
 class BaseField:
@@ -81,6 +171,22 @@ class FactoryField(BaseField):
         return data_dict.get(self._name, self._factory())
 
 
+class WeightsField(BaseField):
+    """Дескриптор для весов модели.
+
+    Веса загружаются из GridFS только при первом обращении к полю, поэтому работа с метриками популяции не требует
+    загрузки весов.
+    """
+
+    def __get__(self, instance: Any, owner: type) -> Any:
+        """При отсутствии загруженного значения загружает веса."""
+        data_dict = vars(instance)  # noqa: WPS421
+        if self._name not in data_dict:
+            data_dict[self._name] = _load_weights(data_dict[ID], data_dict.get(WEIGHTS))
+
+        return data_dict[self._name]
+
+
 class GenotypeField(BaseField):
     """Дескриптор для генотипа."""
 
@@ -103,38 +209,88 @@ class Doc:
         *,
         id_: Optional[bson.ObjectId] = None,
         genotype: Optional[Genotype] = None,
+        doc: Optional[dict[str, Any]] = None,
     ):
-        """Создает словарь для хранения изменений. Загружает данные по id или создает id."""
+        """Создает словарь для хранения изменений. Загружает данные по id или создает id.
+
+        При наличии уже полученного из MongoDB документа данные берутся из него без дополнительных запросов.
+        """
         self._update = {}
-        if id_ is None:
+        if doc is not None:
+            self._set_fields(doc)
+        elif id_ is None:
             self.id = bson.ObjectId()  # noqa: WPS601
             self.genotype = genotype  # noqa: WPS601
+            vars(self)[MODEL] = None  # noqa: WPS421
         else:
             self._load(id_)
 
     def save(self) -> None:
-        """Сохраняет измененные значения в MongoDB."""
-        collection = get_collection()
+        """Сохраняет измененные значения в MongoDB.
+
+        Обновления документа откладываются и объединяются до вызова flush. При изменении весов модели документ
+        записывается сразу вместе со ссылкой на новый файл весов.
+        """
         update = self._update
-        collection.update_one(
-            filter={ID: self.id},
-            update={"$set": self._update},
-            upsert=True,
-        )
+        weights_changed = MODEL in update
+        weights = update.pop(MODEL, None)
+
+        request = {}
+        if update:
+            request["$set"] = dict(update)
         update.clear()
 
+        if weights_changed:
+            self._save_weights(weights, request)
+        elif request:
+            _defer_update(self.id, request)
+
+    def _save_weights(self, weights: Optional[bytes], request: dict[str, dict[str, Any]]) -> None:
+        """Сохраняет веса модели в новый файл GridFS и записывает документ со ссылкой на него.
+
+        Новый файл записывается до обновления ссылки, а старый удаляется после, поэтому при сбое документ всегда
+        ссылается на существующий файл. Вместе со ссылкой записываются отложенные обновления документа, а копия весов
+        в старом формате удаляется из документа.
+        """
+        _defer_update(self.id, request)
+        _, request = _PENDING.pop(self.id)
+
+        weights_fs = get_weights_fs()
+        file_id = None if weights is None else weights_fs.put(zlib.compress(weights))
+        request.setdefault("$set", {})[WEIGHTS] = file_id
+        request.setdefault("$unset", {})[MODEL] = ""
+
+        collection = get_collection()
+        old_doc = collection.find_one_and_update({ID: self.id}, request, projection=[WEIGHTS], upsert=True)
+        vars(self)[WEIGHTS] = file_id  # noqa: WPS421
+
+        if (old_file := _old_weights_file(old_doc, self.id)) is not None:
+            weights_fs.delete(old_file)
+
     def delete(self) -> None:
-        """Удаляет документ из базы."""
+        """Удаляет документ и веса модели из базы."""
+        _PENDING.pop(self.id, None)
         collection = get_collection()
-        collection.delete_one({ID: self.id})
+        doc = collection.find_one_and_delete({ID: self.id}, projection=[WEIGHTS])
+
+        if (file_id := _old_weights_file(doc, self.id)) is not None:
+            get_weights_fs().delete(file_id)
 
     def _load(self, id_: bson.ObjectId) -> None:
+        """Загружает документ с учетом его отложенных обновлений."""
         collection = get_collection()
-        doc = collection.find_one({ID: id_})
+        doc = collection.find_one({ID: id_}, projection={MODEL: False})
+
+        if (pending := _PENDING.get(id_)) is not None:
+            _, update = pending
+            doc = (doc or {ID: id_}) | update.get("$set", {})
 
         if doc is None:
             raise IdError(id_)
 
+        self._set_fields(doc)
+
+    def _set_fields(self, doc: dict[str, Any]) -> None:
         for key, value in doc.items():  # noqa: WPS110
             setattr(self, key, value)
 
@@ -143,10 +299,15 @@ class Doc:
     id = BaseField(index=True)
     genotype = GenotypeField()
     wins = DefaultField(0)
-    model = DefaultField()
+    model = WeightsField()
     llh = FactoryField(list)
     ir = FactoryField(list)
     ub = DefaultField(0)
     date = DefaultField()
     timer = DefaultField(0)
     tickers = DefaultField()
+    proxy = DefaultField()
+    trained = DefaultField()
+    warm = DefaultField(0)
+    cost = DefaultField()
+    forecast = DefaultField()
@@ -0,0 +1,57 @@
+"""Суррогатная модель для отбора потомков до обучения."""
+from typing import Final
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+
+from poptimizer.evolve.genotype import Genotype
+
+# Минимальное количество оцененных организмов для обучения суррогатной модели
+MIN_SAMPLES: Final = 10
+# Метрики, которые прогнозирует суррогатная модель
+METRICS: Final = ("llh", "ir")
+
+
+class Surrogate:
+    """Суррогатная модель медианных LLH и RET на основе векторного представления генотипа.
+
+    Обучается на оцененных организмах популяции. Потомки ранжируются по худшему из перцентилей прогнозов LLH и RET
+    среди медианных значений популяции, так как для сохранения в популяции организм не должен уступать ни по одной из
+    метрик. При недостаточном количестве организмов все потомки считаются равноценными.
+    """
+
+    def __init__(self, genotypes: list[Genotype], **scores: list[float]) -> None:
+        """Обучает модели для каждой метрики.
+
+        :param genotypes:
+            Генотипы оцененных организмов.
+        :param scores:
+            Медианные значения метрик организмов в том же порядке, что и генотипы.
+        """
+        self._population = {metric: np.sort(scores[metric]) for metric in METRICS}
+        self._models = {}
+
+        if len(genotypes) < MIN_SAMPLES:
+            return
+
+        features = np.vstack([genotype.to_vector() for genotype in genotypes])
+        for metric in METRICS:
+            model = GradientBoostingRegressor(random_state=0)
+            self._models[metric] = model.fit(features, scores[metric])
+
+    def score(self, genotypes: list[Genotype]) -> np.ndarray:
+        """Прогнозная доля организмов популяции, которых превзойдет генотип по худшей из метрик."""
+        if not self._models:
+            return np.zeros(len(genotypes))
+
+        features = np.vstack([genotype.to_vector() for genotype in genotypes])
+        percentiles = [
+            np.searchsorted(self._population[metric], model.predict(features)) / len(self._population[metric])
+            for metric, model in self._models.items()
+        ]
+
+        return np.min(percentiles, axis=0)
+
+    def best(self, genotypes: list[Genotype]) -> int:
+        """Номер генотипа с максимальной оценкой — первого при равенстве оценок."""
+        return int(np.argmax(self.score(genotypes)))
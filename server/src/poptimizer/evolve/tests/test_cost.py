@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from poptimizer.evolve import cost, genotype
+
+
+@pytest.fixture(scope="module", name="phenotypes")
+def make_phenotypes():
+    np.random.seed(0)
+
+    return [genotype.Genotype().get_phenotype() for _ in range(30)]
+
+
+def test_features(phenotypes):
+    features = cost.features(phenotypes[0], 10)
+
+    assert features.shape == (cost.N_FEATURES,)
+    assert features[0] == 1
+    assert features[2] == pytest.approx(np.log(10))
+
+
+def test_not_enough_samples(phenotypes):
+    costs = [cost.features(phenotype, 10).tolist() for phenotype in phenotypes[: cost.MIN_SAMPLES - 1]]
+    model = cost.CostModel(costs, [1.0] * len(costs))
+
+    assert model.predict(phenotypes[0], 10) is None
+    assert model.slowness(phenotypes[0], 10) is None
+
+
+def test_predict(phenotypes):
+    coef = np.array([2, 1, 1, 1, -0.5, 1])
+    costs = [cost.features(phenotype, 10) for phenotype in phenotypes[:20]]
+    timers = [np.exp(features @ coef) for features in costs]
+
+    model = cost.CostModel([features.tolist() for features in costs], timers)
+
+    for phenotype in phenotypes[20:]:
+        assert model.predict(phenotype, 10) == pytest.approx(np.exp(cost.features(phenotype, 10) @ coef))
+
+    fastest = phenotypes[int(np.argmin(timers))]
+    assert model.slowness(fastest, 10) <= 1 / len(timers)
@@ -0,0 +1,37 @@
+import datetime
+
+import pytest
+
+from poptimizer import config
+from poptimizer.evolve import evolve
+
+
+@pytest.mark.parametrize(
+    "start, stop, now, window_end",
+    [
+        (1, 1, datetime.datetime(2021, 3, 1, 12), None),
+        (1, 7, datetime.datetime(2021, 3, 1, 3, 30), datetime.datetime(2021, 3, 1, 7)),
+        (22, 7, datetime.datetime(2021, 3, 1, 23), datetime.datetime(2021, 3, 2, 7)),
+        (22, 7, datetime.datetime(2021, 3, 1, 7), datetime.datetime(2021, 3, 2, 7)),
+    ],
+)
+def test_window_end(monkeypatch, start, stop, now, window_end):
+    monkeypatch.setattr(config, "START_EVOLVE_HOUR", start)
+    monkeypatch.setattr(config, "STOP_EVOLVE_HOUR", stop)
+
+    if window_end is not None:
+        window_end = window_end.timestamp()
+
+    assert evolve._window_end(now) == window_end
+
+
+def test_fits_window(monkeypatch):
+    monkeypatch.setattr(config, "START_EVOLVE_HOUR", 1)
+    monkeypatch.setattr(config, "STOP_EVOLVE_HOUR", 1)
+    assert evolve._fits_window(10**20)
+
+    monkeypatch.setattr(evolve, "_window_end", lambda: 100.0)
+    monkeypatch.setattr(evolve.time, "time", lambda: 40.0)
+    assert evolve._fits_window(None)
+    assert evolve._fits_window(59 * 10**9)
+    assert not evolve._fits_window(61 * 10**9)
@@ -71,3 +71,15 @@ def test_make_child_zero_scale():
 
     assert isinstance(child, genotype.Genotype)
     assert child.data == parent.data
+
+
+def test_vector_roundtrip():
+    """Векторное представление сохраняет значения всех генов."""
+    parent = genotype.Genotype()
+    vector = parent.to_vector()
+    lower, upper = parent.bounds()
+
+    assert vector.shape == lower.shape == upper.shape
+    assert parent.from_vector(vector).data == parent.data
+    assert parent.from_vector(vector * 0)["Data"]["batch_size"] == 0
+    assert parent["Data"]["batch_size"] != 0
@@ -0,0 +1,59 @@
+import bson
+import numpy as np
+import pandas as pd
+import pytest
+
+from poptimizer.evolve import metrics
+
+IDS = [bson.ObjectId() for _ in range(3)]
+DOCS = (
+    {"_id": IDS[0], "date": pd.Timestamp("2020-04-14"), "llh": [1, 2, 3], "ir": [0, 0, 0], "timer": 30},
+    {"_id": IDS[1], "date": pd.Timestamp("2020-04-13"), "llh": [5, 6], "ir": [1, 1], "timer": 10},
+    {"_id": IDS[2], "date": pd.Timestamp("2020-04-14"), "llh": [3], "ir": [2], "timer": 20},
+)
+
+
+@pytest.fixture(name="index")
+def make_index():
+    index = metrics.MetricsIndex()
+    index.load(DOCS)
+
+    return index
+
+
+def test_aligned_diff(index):
+    diff = index.aligned_diff(pd.Timestamp("2020-04-14"), [3, 3, 3], "llh")
+
+    np.testing.assert_allclose(diff, [1, -0.5, -1.5])
+
+
+@pytest.mark.filterwarnings("ignore:All-NaN slice")
+def test_aligned_diff_longer_than_population(index):
+    diff = index.aligned_diff(pd.Timestamp("2020-04-14"), [0, 0, 0, 0, 0], "ir")
+
+    assert np.isnan(diff[3:]).all()
+    np.testing.assert_allclose(diff[:3], [-1, -0.5, -0.5])
+
+
+def test_update_and_remove(index):
+    index.update(IDS[2], pd.Timestamp("2020-04-14"), 40, llh=[4, 7, 7, 7], ir=[1, 1, 1, 1])
+    assert len(index) == 3
+    np.testing.assert_allclose(index.aligned_diff(pd.Timestamp("2020-04-14"), [0, 0, 0, 0], "llh"), [-2.5, -5, -6, -7])
+
+    new_id = bson.ObjectId()
+    index.update(new_id, pd.Timestamp("2020-04-14"), 50, llh=[9], ir=[9])
+    assert len(index) == 4
+    assert index.timer_percentile(45) == pytest.approx(0.75)
+
+    index.remove(IDS[0])
+    index.remove(bson.ObjectId())
+    assert len(index) == 3
+    np.testing.assert_allclose(index.aligned_diff(pd.Timestamp("2020-04-14"), [0], "llh"), [-6.5])
+
+    index.update(new_id, None, 50, llh=[], ir=[])
+    assert len(index) == 2
+
+
+def test_timer_percentile(index):
+    assert index.timer_percentile(20) == pytest.approx(0.5)
+    assert index.timer_percentile(100) == pytest.approx(1)
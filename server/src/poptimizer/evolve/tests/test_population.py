@@ -1,11 +1,13 @@
 import logging
+import types
 from typing import Iterable
 
+import numpy as np
 import pandas as pd
 import pytest
 
 from poptimizer.dl import Forecast
-from poptimizer.evolve import population, store
+from poptimizer.evolve import cost, population, store
 
 
 @pytest.fixture(scope="module", autouse=True)
@@ -23,16 +25,43 @@ def set_test_collection():
 
 class FakeModel:
     COUNTER = 0
+    proxy_llh = None
+    restored_ns = 0
 
     # noinspection PyUnusedLocal
-    def __init__(self, tickers, end, phenotype, pickled_model=None):
-        pass
+    def __init__(
+        self,
+        tickers,
+        end,
+        phenotype,
+        pickled_model=None,
+        screening_llh=None,
+        warm_start=None,
+        *,
+        checkpoint=None,
+        deadline=None,
+    ):
+        self.warm_started = warm_start is not None
+        self._tickers = tickers
+        self._end = end
 
     @property
     def quality_metrics(self):
         self.__class__.COUNTER += 1
         return 5, 7
 
+    def quality_metrics_history(self, days):
+        self.__class__.COUNTER += 1
+        dates = pd.bdate_range(end=self._end, periods=days)
+        return {date: (day, 7) for day, date in enumerate(dates)}
+
+    def forecast_moments(self):
+        return pd.Series(1.0, index=list(self._tickers)), pd.Series(2.0, index=list(self._tickers))
+
+    def forecast(self, moments=None):
+        mean, std = moments or self.forecast_moments()
+        return types.SimpleNamespace(date=self._end, mean=mean, std=std, cov=np.diag(std**2))
+
     def __bytes__(self):
         return bytes(6)
 
@@ -100,6 +129,17 @@ def test_evaluate_new_tickers(organism):
     assert organism.tests == 3
 
 
+@pytest.mark.usefixtures("fake_model")
+def test_evaluate_fitness_dates(organism):
+    dates = [pd.Timestamp("2020-04-09"), pd.Timestamp("2020-04-08")]
+
+    fitness = organism.evaluate_fitness_dates(("GAZP", "LKOH"), dates)
+
+    assert fitness == [5, 5, 5, 1, 0]
+    assert FakeModel.COUNTER == 4
+    assert organism._doc.date == pd.Timestamp("2020-04-14")
+
+
 # noinspection PyProtectedMember
 @pytest.fixture()
 def make_weak_organism():
@@ -138,12 +178,85 @@ def test_make_child(one_of_three):
     assert isinstance(one_of_three.make_child(1), population.Organism)
 
 
+def test_make_child_from_pool(mocker):
+    get_pool = mocker.patch.object(population, "get_parents_pool")
+    pool = [population.Organism(), population.Organism(), population.Organism()]
+
+    child = pool[0].make_child(1, pool)
+
+    assert isinstance(child, population.Organism)
+    assert child.genotype is not pool[0].genotype
+    get_pool.assert_not_called()
+
+
 def test_raise_forecast_error():
     with pytest.raises(population.ForecastError) as error:
         population.Organism().forecast(("GAZP", "AKRN"), pd.Timestamp("2020-04-13"))
     assert isinstance(population.ForecastError(), error.type)
 
 
+@pytest.mark.usefixtures("fake_model")
+def test_evaluate_fitness_dates_mismatch():
+    org = population.Organism()
+    org._doc.tickers = ["GAZP", "AKRN"]
+    org._doc.model = bytes(6)
+
+    with pytest.raises(population.EvaluationDatesError):
+        org.evaluate_fitness_dates(("GAZP", "AKRN"), [pd.Timestamp("2020-04-09"), pd.Timestamp("2020-04-06")])
+
+    assert org.llh == []
+
+
+@pytest.mark.usefixtures("fake_model")
+def test_saved_forecast():
+    org = population.Organism()
+    org._doc.tickers = ["GAZP", "AKRN"]
+    org._doc.forecast = {
+        "date": pd.Timestamp("2020-04-21"),
+        "tickers": ["GAZP", "AKRN"],
+        "mean": [3.0, 4.0],
+        "std": [5.0, 6.0],
+    }
+
+    rez = org.forecast(("GAZP", "AKRN"), pd.Timestamp("2020-04-21"))
+
+    assert rez.mean.to_dict() == {"GAZP": 3.0, "AKRN": 4.0}
+    assert rez.std.to_dict() == {"GAZP": 5.0, "AKRN": 6.0}
+
+    with pytest.raises(population.ForecastError):
+        org.forecast(("GAZP", "AKRN"), pd.Timestamp("2020-04-22"))
+
+    org._doc.forecast |= {"tickers": ["AKRN", "GAZP"]}
+    with pytest.raises(population.ForecastError):
+        org.forecast(("GAZP", "AKRN"), pd.Timestamp("2020-04-21"))
+
+
+@pytest.mark.usefixtures("fake_model")
+def test_save_forecast_after_newest_evaluation():
+    org = population.Organism()
+    org._doc.tickers = ["GAZP", "AKRN"]
+    org._doc.model = bytes(6)
+
+    org.save_forecast()
+    assert org._doc.forecast is None
+
+    org.evaluate_fitness(("GAZP", "AKRN"), pd.Timestamp("2020-04-21"))
+    org.evaluate_fitness(("GAZP", "AKRN"), pd.Timestamp("2020-04-20"))
+    org.save_forecast()
+    assert org._doc.forecast is None
+
+    org.evaluate_fitness(("GAZP", "AKRN"), pd.Timestamp("2020-04-22"))
+    org.save_forecast()
+    assert org._doc.forecast == {
+        "date": pd.Timestamp("2020-04-22"),
+        "tickers": ["GAZP", "AKRN"],
+        "mean": [1.0, 1.0],
+        "std": [2.0, 2.0],
+    }
+
+    org.die()
+
+
 def test_forecast():
     org = population.Organism()
     org.evaluate_fitness(("GAZP", "AKRN"), pd.Timestamp("2020-04-21"))
@@ -159,10 +272,12 @@ def test_count():
 
     org1 = population.Organism()
     org1._doc.save()
+    store.flush()
     assert population.count() == 5
 
     org2 = population.Organism()
     org2._doc.save()
+    store.flush()
     assert population.count() == 6
 
     org1.die()
@@ -206,3 +321,91 @@ def test_print_stat(caplog):
 
     assert "LLH" in caplog.records[0].msg
     assert "Максимум оценок" in caplog.records[2].msg
+
+
+def test_median_proxy():
+    assert population.median_proxy() is None
+
+    orgs = []
+    for proxy in (0.1, 0.3, 0.2, float("nan")):
+        org = population.Organism()
+        org._doc.proxy = proxy
+        org.save()
+        orgs.append(org)
+    store.flush()
+
+    assert population.median_proxy() == pytest.approx(0.2)
+
+    for org in orgs:
+        org.die()
+
+
+@pytest.mark.usefixtures("fake_model")
+def test_retrain_warm_start(monkeypatch):
+    monkeypatch.setattr(population.config, "WARM_START_MAX", 2)
+    org = population.Organism()
+
+    org.retrain(("GAZP", "AKRN"), pd.Timestamp("2020-04-13"))
+    assert org._doc.warm == 0
+    assert org._doc.trained == pd.Timestamp("2020-04-13")
+    timer = org._doc.timer
+    assert timer > 0
+    assert len(org.cost) == cost.N_FEATURES
+
+    org.retrain(("GAZP", "LKOH"), pd.Timestamp("2020-04-14"))
+    assert org._doc.warm == 1
+    assert org._doc.timer == timer
+
+    org.retrain(("GAZP", "LKOH"), pd.Timestamp("2020-04-10"))
+    assert org._doc.warm == 0
+
+    org.retrain(("GAZP", "LKOH"), pd.Timestamp("2020-04-14"))
+    org.retrain(("GAZP", "LKOH"), pd.Timestamp("2020-04-15"))
+    assert org._doc.warm == 2
+
+    org.retrain(("GAZP", "LKOH"), pd.Timestamp("2020-04-16"))
+    assert org._doc.warm == 0
+
+    org.die()
+
+
+@pytest.fixture(name="dates_collection")
+def make_dates_collection(monkeypatch):
+    collection = store._COLLECTION.database["test_dates"]
+    monkeypatch.setattr(store, "_COLLECTION", collection)
+
+    yield collection
+
+    collection.drop()
+
+
+def test_min_max_date_and_next_one(dates_collection):
+    assert population.min_max_date() == (None, None)
+    assert population.get_next_one() is None
+
+    for date, ub, wins in (("2020-04-14", 1, 3), ("2020-04-10", 2, 1), ("2020-04-10", 3, 2)):
+        org = population.Organism()
+        org._doc.date = pd.Timestamp(date)
+        org._doc.ub = ub
+        org._doc.wins = wins
+        org.save()
+    store.flush()
+
+    assert population.min_max_date() == (pd.Timestamp("2020-04-10"), pd.Timestamp("2020-04-14"))
+    assert population.get_next_one().date == pd.Timestamp("2020-04-10")
+
+
+def test_get_all_snapshot(dates_collection, mocker):
+    for wins in (1, 2):
+        org = population.Organism()
+        org._doc.wins = wins
+        org._doc.model = bytes(wins)
+        org.save()
+    store.flush()
+
+    find_one = mocker.spy(dates_collection, "find_one")
+    organisms = list(population.get_all(["wins"]))
+
+    assert [org.scores for org in organisms] == [1, 2]
+    assert find_one.call_count == 0
+    assert organisms[1]._doc.model == bytes(2)
@@ -17,6 +17,13 @@ def test_median_conf_radius(t, alfa, radius):
     assert seq._median_conf_radius(t, alfa) == pytest.approx(radius)
 
 
+def test_median_conf_radius_array():
+    """Расчет радиусов для массива моментов времени совпадает с поэлементным."""
+    radii = seq._median_conf_radius(np.array([case[0] for case in RADIUS_CASES]), 0.05)
+
+    assert radii[:2] == pytest.approx([RADIUS_CASES[0][2], RADIUS_CASES[1][2]])
+
+
 ALFA_CASES = (0.05, 0.025)
 
 
@@ -28,6 +35,16 @@ def test_minimum_n(alfa):
     assert seq._median_conf_radius(n - 1, alfa, n - 1) > 0.5
 
 
+@pytest.mark.parametrize("alfa", [0.5, 0.05, 1e-3, 1e-6])
+def test_minimum_n_closed_form(alfa):
+    """Явная формула совпадает с последовательным перебором."""
+    n = 1
+    while seq._median_conf_radius(n, alfa, n) >= 0.5:
+        n += 1
+
+    assert seq.minimum_bounding_n(alfa) == n
+
+
 def test_median_conf_bound_small_sample():
     """Ошибка при короткой выборке."""
     assert (-np.inf, np.inf) == seq.median_conf_bound(list(range(11)), 0.025)
@@ -45,3 +62,15 @@ def test_median_conf_bound():
     lower1, upper1 = seq.median_conf_bound(sample, 0.025)
     assert lower1 > lower0
     assert upper1 < upper0
+
+
+@pytest.mark.parametrize("alfa", ALFA_CASES)
+def test_median_conf_bounds_prefixes(alfa):
+    """Совпадение с расчетом для каждого начального отрезка выборки."""
+    sample = np.random.default_rng(0).normal(size=40)
+
+    medians, lower, upper = seq.median_conf_bounds_prefixes(sample, alfa)
+
+    for t in range(1, len(sample) + 1):
+        assert medians[t - 1] == pytest.approx(np.median(sample[:t]))
+        assert (lower[t - 1], upper[t - 1]) == pytest.approx(seq.median_conf_bound(sample[:t], alfa))
@@ -1,4 +1,5 @@
 import math
+import zlib
 from types import SimpleNamespace
 
 import bson
@@ -27,6 +28,15 @@ def test_get_collection():
     assert collection.name == "test"
 
 
+def test_collection_indexes():
+    store._INDEXED.clear()
+    keys = [list(index["key"]) for index in store.get_collection().index_information().values()]
+
+    assert [("date", 1), ("ub", -1), ("_id", 1)] in keys
+    assert [("date", 1), ("wins", 1), ("_id", 1)] in keys
+    assert [("wins", 1)] in keys
+
+
 @pytest.fixture(scope="class", name="field_instance")
 def make_field_and_instance():
     field = store.BaseField()
@@ -143,6 +153,7 @@ class TestDoc:
         assert doc.tickers is None
 
         doc.save()
+        store.flush()
 
         assert store.get_collection().count_documents({}) == 1
         assert len(doc._update) == 0
@@ -206,3 +217,106 @@ class TestDoc:
         doc.delete()
 
         assert store.get_collection().count_documents({}) == 0
+
+    def test_weights_in_gridfs(self):
+        doc = store.Doc(genotype=store.Genotype())
+        doc.model = bytes(range(10)) * 100
+        doc.save()
+        store.flush()
+
+        db_doc = store.get_collection().find_one({store.ID: doc.id})
+        assert store.MODEL not in db_doc
+        file_id = db_doc[store.WEIGHTS]
+        assert store.get_weights_fs().exists(file_id)
+
+        doc_loaded = store.Doc(id_=doc.id)
+        assert store.MODEL not in vars(doc_loaded)
+        assert doc_loaded.model == bytes(range(10)) * 100
+
+        doc.delete()
+
+        assert store.get_collection().count_documents({}) == 0
+        assert not store.get_weights_fs().exists(file_id)
+
+    def test_replace_weights(self):
+        doc = store.Doc(genotype=store.Genotype())
+        doc.model = b"old"
+        doc.save()
+        old_file = store.get_collection().find_one({store.ID: doc.id})[store.WEIGHTS]
+
+        doc.wins = 3
+        doc.model = b"new"
+        doc.save()
+
+        db_doc = store.get_collection().find_one({store.ID: doc.id})
+        assert db_doc[store.WEIGHTS] != old_file
+        assert db_doc["wins"] == 3
+        assert not store.get_weights_fs().exists(old_file)
+        assert store.get_weights_fs().exists(db_doc[store.WEIGHTS])
+        assert store.Doc(id_=doc.id).model == b"new"
+
+        doc.model = None
+        doc.save()
+
+        assert store.get_collection().find_one({store.ID: doc.id})[store.WEIGHTS] is None
+        assert store.Doc(id_=doc.id).model is None
+
+        doc.delete()
+
+    def test_legacy_gridfs_weights(self):
+        id_ = bson.ObjectId()
+        store.get_collection().insert_one({store.ID: id_})
+        store.get_weights_fs().put(zlib.compress(b"legacy"), _id=id_)
+
+        doc = store.Doc(id_=id_)
+        assert doc.model == b"legacy"
+
+        doc.model = b"new"
+        doc.save()
+
+        assert not store.get_weights_fs().exists(id_)
+        assert store.Doc(id_=id_).model == b"new"
+
+        doc.delete()
+
+    def test_legacy_inline_weights(self):
+        id_ = bson.ObjectId()
+        store.get_collection().insert_one({store.ID: id_, store.MODEL: b"legacy"})
+
+        doc = store.Doc(id_=id_)
+        assert doc.model == b"legacy"
+
+        doc.model = b"new"
+        doc.save()
+        store.flush()
+
+        assert store.MODEL not in store.get_collection().find_one({store.ID: id_})
+        assert store.Doc(id_=id_).model == b"new"
+
+        doc.delete()
+
+    def test_deferred_save(self):
+        doc = store.Doc(genotype=store.Genotype())
+        doc.save()
+        doc.wins = 1
+        doc.save()
+        doc.llh = [1.0]
+        doc.save()
+
+        assert len(store._PENDING) == 1
+        assert store.get_collection().count_documents({}) == 0
+
+        doc_loaded = store.Doc(id_=doc.id)
+        assert doc_loaded.wins == 1
+        assert doc_loaded.llh == [1.0]
+
+        store.flush()
+        assert not store._PENDING
+        assert store.get_collection().count_documents({}) == 1
+
+        doc.wins = 2
+        doc.save()
+        doc.delete()
+
+        assert not store._PENDING
+        assert store.get_collection().count_documents({}) == 0
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from poptimizer.evolve import genotype, surrogate
+
+
+@pytest.fixture(scope="module", name="genotypes")
+def make_genotypes():
+    np.random.seed(0)
+
+    return [genotype.Genotype() for _ in range(40)]
+
+
+def _batch_size(genotype_):
+    return genotype_["Data"]["batch_size"]
+
+
+def test_score_without_enough_samples(genotypes):
+    few = genotypes[: surrogate.MIN_SAMPLES - 1]
+    model = surrogate.Surrogate(few, llh=[0] * len(few), ir=[0] * len(few))
+
+    assert model.score(genotypes).tolist() == [0] * len(genotypes)
+    assert model.best(genotypes) == 0
+
+
+def test_best(genotypes):
+    train = genotypes[:30]
+    llh = [_batch_size(genotype_) for genotype_ in train]
+    ir = [-_batch_size(genotype_) + 1000 for genotype_ in train]
+    model = surrogate.Surrogate(train, llh=llh, ir=ir)
+
+    scores = model.score(genotypes[30:])
+
+    assert np.all((scores >= 0) & (scores <= 1))
+
+    model = surrogate.Surrogate(train, llh=llh, ir=llh)
+    candidates = genotypes[30:]
+
+    assert model.best(candidates) == np.argmax([_batch_size(genotype_) for genotype_ in candidates])